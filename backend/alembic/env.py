@@ -1,19 +1,24 @@
 from logging.config import fileConfig
 
-import config as env_config
-import models
 from alembic import context
 from sqlalchemy import engine_from_config, pool
 
+from backend import config as env_config
+from backend import models
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
-fileConfig(config.config_file_name)
+# skipped when migrations run from code that configured logging already
+if config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
 
-config.set_main_option("sqlalchemy.url", env_config.DATABASE_URL)
+config.set_main_option(
+    "sqlalchemy.url", config.attributes.get("url") or env_config.DATABASE_URL
+)
 
 # add your model's MetaData object here
 # for 'autogenerate' support
@@ -0,0 +1,32 @@
+"""Add todo_versions
+
+Revision ID: 3c1d7a9e52f4
+Revises: ef8cfade9b43
+Create Date: 2026-10-17 12:52:08.731114
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "3c1d7a9e52f4"
+down_revision: Union[str, None] = "ef8cfade9b43"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_versions",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("todo_versions")
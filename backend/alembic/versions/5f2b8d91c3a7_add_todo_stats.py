@@ -0,0 +1,47 @@
+"""Add todo_stats
+
+Revision ID: 5f2b8d91c3a7
+Revises: d4a8c3e1f602
+Create Date: 2026-10-17 14:02:37.504219
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5f2b8d91c3a7"
+down_revision: Union[str, None] = "d4a8c3e1f602"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRIORITIES = range(1, 6)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "todo_stats",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("completed", sa.Integer(), nullable=False),
+        *(sa.Column(f"priority_{p}", sa.Integer(), nullable=False) for p in PRIORITIES),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("owner_id"),
+    )
+    # backfill from the todos written before the table existed
+    columns = ", ".join(f"priority_{p}" for p in PRIORITIES)
+    sums = ", ".join(
+        f"SUM(CASE WHEN priority = {p} THEN 1 ELSE 0 END)" for p in PRIORITIES
+    )
+    op.execute(
+        f"INSERT INTO todo_stats (owner_id, total, completed, {columns}) "
+        "SELECT owner_id, COUNT(*), "
+        f"SUM(CASE WHEN completed THEN 1 ELSE 0 END), {sums} "
+        "FROM todos WHERE owner_id IS NOT NULL GROUP BY owner_id"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("todo_stats")
@@ -1,7 +1,7 @@
 """Create Phone number for users column
 
 Revision ID: 6600cbd1ad3b
-Revises:
+Revises: 1f0c5a7e3b92
 Create Date: 2024-06-24 13:46:53.883485
 
 """
@@ -13,7 +13,7 @@ from alembic import op
 
 # revision identifiers, used by Alembic.
 revision: str = "6600cbd1ad3b"
-down_revision: Union[str, None] = None
+down_revision: Union[str, None] = "1f0c5a7e3b92"
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
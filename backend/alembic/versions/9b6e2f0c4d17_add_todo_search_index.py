@@ -0,0 +1,87 @@
+"""Add todo search index
+
+Revision ID: 9b6e2f0c4d17
+Revises: 3c1d7a9e52f4
+Create Date: 2026-10-17 13:05:44.902317
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9b6e2f0c4d17"
+down_revision: Union[str, None] = "3c1d7a9e52f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_UPGRADE = (
+    """
+    CREATE VIRTUAL TABLE todos_fts USING fts5(
+        title, description, owner_id,
+        content='todos', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description, owner_id)
+        VALUES (new.id, new.title, new.description, new.owner_id);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+    END
+    """,
+    """
+    CREATE TRIGGER todos_fts_update
+    AFTER UPDATE OF title, description, owner_id ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+        INSERT INTO todos_fts(rowid, title, description, owner_id)
+        VALUES (new.id, new.title, new.description, new.owner_id);
+    END
+    """,
+    # backfill the rows written before the index existed
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+)
+
+SQLITE_DOWNGRADE = (
+    "DROP TRIGGER todos_fts_update",
+    "DROP TRIGGER todos_fts_delete",
+    "DROP TRIGGER todos_fts_insert",
+    "DROP TABLE todos_fts",
+)
+
+POSTGRES_UPGRADE = (
+    "CREATE INDEX ix_todos_search ON todos USING GIN "
+    "(to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '')))",
+)
+
+POSTGRES_DOWNGRADE = ("DROP INDEX ix_todos_search",)
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        statements = SQLITE_UPGRADE
+    elif dialect == "postgresql":
+        statements = POSTGRES_UPGRADE
+    else:
+        statements = ()
+    for statement in statements:
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        statements = SQLITE_DOWNGRADE
+    elif dialect == "postgresql":
+        statements = POSTGRES_DOWNGRADE
+    else:
+        statements = ()
+    for statement in statements:
+        op.execute(statement)
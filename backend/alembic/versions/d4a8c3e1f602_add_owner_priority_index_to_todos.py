@@ -0,0 +1,27 @@
+"""Add owner/priority index to todos
+
+Revision ID: d4a8c3e1f602
+Revises: 9b6e2f0c4d17
+Create Date: 2026-10-17 13:24:10.118342
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "d4a8c3e1f602"
+down_revision: Union[str, None] = "9b6e2f0c4d17"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_todos_owner_id_priority_id", "todos", ["owner_id", "priority", "id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todos_owner_id_priority_id", table_name="todos")
@@ -0,0 +1,31 @@
+"""Add owner indexes to todos
+
+Revision ID: ef8cfade9b43
+Revises: 6600cbd1ad3b
+Create Date: 2026-10-17 09:12:41.516204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "ef8cfade9b43"
+down_revision: Union[str, None] = "6600cbd1ad3b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_todos_owner_id_id", "todos", ["owner_id", "id"])
+    op.create_index(
+        "ix_todos_owner_id_completed_priority",
+        "todos",
+        ["owner_id", "completed", "priority"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_todos_owner_id_completed_priority", table_name="todos")
+    op.drop_index("ix_todos_owner_id_id", table_name="todos")
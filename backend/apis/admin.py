@@ -1,36 +1,105 @@
-from typing import Annotated
+import csv
+import io
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
+from starlette.responses import StreamingResponse
 
-from .. import models
-from ..database import SessionLocal
+from .. import hashing, models, ratelimit, schemas, stats
+from ..cache import todo_lists
+from ..database import db_dependency, execute_returning, pool_stats
+from ..etags import bump_todo_version
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
 from .auth import get_current_user
 
 router = APIRouter(tags=["admin_api"])
 
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
 
-def get_db():
-    db = SessionLocal()
+async def export_todos(db: AsyncSession, export_format: str):
+    """Yield the whole todos table encoded as ndjson or csv, batch by batch.
+
+    Rows come from a server-side cursor as plain column tuples, so memory stays
+    flat no matter how large the table is. The request's session has already
+    been handed back by the time the body streams, so it is closed here.
+    """
+    columns = models.Todos.__table__.columns
     try:
-        yield db
+        result = await db.stream(
+            select(*columns)
+            .order_by(models.Todos.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(column.key for column in columns)
+
+        async for rows in result.partitions():
+            for row in rows:
+                if export_format == "csv":
+                    writer.writerow(row)
+                else:
+                    buffer.write(orjson.dumps(row._asdict()).decode() + "\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()
     finally:
-        db.close()
+        await db.close()
 
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
+@router.get("/todo/", response_model=schemas.TodoPage, status_code=status.HTTP_200_OK)
+async def read_all(
+    user: user_dependency,
+    db: db_dependency,
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    export_format: Literal["ndjson", "csv"] | None = Query(
+        default=None, alias="format"
+    ),
+):
+    if user is None or user.get("user_role").casefold() not in ("admin", "superuser"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
+        )
+
+    if export_format is not None:
+        return StreamingResponse(
+            export_todos(db, export_format),
+            media_type=EXPORT_MEDIA_TYPES[export_format],
+            headers={
+                "Content-Disposition": f'attachment; filename="todos.{export_format}"'
+            },
+        )
+
+    return await paginate(
+        db, select(*models.Todos.__table__.c), (models.Todos.id,), limit, cursor
+    )
 
 
-@router.get("/todo/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+@router.get(
+    "/todo/stats/",
+    response_model=schemas.TodoStatsSummary,
+    status_code=status.HTTP_200_OK,
+)
+async def read_stats(user: user_dependency, db: db_dependency):
+    """Todo counts across all users, summed from ``todo_stats``."""
     if user is None or user.get("user_role").casefold() not in ("admin", "superuser"):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
 
-    return db.query(models.Todos).all()
+    return await stats.summary(db)
 
 
 @router.delete("/todo/{todo_id}/", status_code=status.HTTP_204_NO_CONTENT)
@@ -44,9 +113,60 @@ async def delete_todo(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
 
-    todo = db.query(models.Todos).filter(models.Todos.id == todo_id).first()
-    if todo is not None:
-        db.delete(todo)
-        db.commit()
+    deleted = await execute_returning(
+        db,
+        delete(models.Todos).where(models.Todos.id == todo_id),
+        models.Todos.owner_id,
+        models.Todos.completed,
+        models.Todos.priority,
+    )
+    if deleted is not None:
+        await stats.apply(db, deleted.owner_id, stats.change(deleted, None))
+        await bump_todo_version(db, deleted.owner_id)
+        await db.commit()
+        todo_lists.invalidate(deleted.owner_id)
         return
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="item not found.")
+
+
+@router.get("/metrics/hashing/", status_code=status.HTTP_200_OK)
+async def hashing_metrics(user: user_dependency):
+    if user is None or user.get("user_role").casefold() not in ("admin", "superuser"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
+        )
+
+    return hashing.pool.metrics()
+
+
+@router.get("/metrics/cache/", status_code=status.HTTP_200_OK)
+async def cache_metrics(user: user_dependency):
+    if user is None or user.get("user_role").casefold() not in ("admin", "superuser"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
+        )
+
+    return {"todo_lists": todo_lists.metrics()}
+
+
+@router.get("/metrics/rate-limits/", status_code=status.HTTP_200_OK)
+async def rate_limit_metrics(user: user_dependency):
+    if user is None or user.get("user_role").casefold() not in ("admin", "superuser"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
+        )
+
+    return {
+        limiter.name: limiter.metrics()
+        for limiter in (ratelimit.login_by_ip, ratelimit.login_by_username)
+    }
+
+
+@router.get("/metrics/db-pool/", status_code=status.HTTP_200_OK)
+async def db_pool_metrics(user: user_dependency):
+    if user is None or user.get("user_role").casefold() not in ("admin", "superuser"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
+        )
+
+    return pool_stats()
@@ -3,15 +3,15 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi.templating import Jinja2Templates
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import HTMLResponse, RedirectResponse
 
-from .. import config, models, schemas
-from ..database import SessionLocal
+from .. import config, hashing, models, schemas, sessions, tokens
+from ..database import db_dependency
+from ..ratelimit import check_login
+from ..tokens import decode_token
 
 router = APIRouter(tags=["auth_api"])
 
@@ -20,41 +20,33 @@ SECRET_KEY = config.JWT_SECRET_KEY
 ALGORITHM = config.JWT_ALGORITHM
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
-
-bcrypt_context = CryptContext(
-    schemes=[
-        "bcrypt",
-    ],
-    deprecated="auto",
-)
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="auth/token")
 
 
 async def authenticate_user(
-    username: str, password: str, db: Session
+    username: str, password: str, db: AsyncSession
 ) -> models.Users | bool:
-    user: models.Users = (
-        db.query(models.Users).filter(models.Users.username == username).first()
+    user: models.Users = await db.scalar(
+        select(models.Users).where(models.Users.username == username)
     )
 
     if not user:
         return False
-    if not bcrypt_context.verify(password, user.hashed_password):
+    verified, new_hash = await hashing.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 
 def create_access_token(
-    username: str, user_id: int, role: str, expires_delta: timedelta
+    username: str,
+    user_id: int,
+    role: str,
+    expires_delta: timedelta,
+    session_id: str | None = None,
 ):
     expires = datetime.now(UTC) + expires_delta
     encode = {
@@ -62,13 +54,31 @@ def create_access_token(
         "id": user_id,
         "role": role,
         "expires_delta": expires.isoformat(),
+        "exp": expires,
+    }
+    if session_id is not None:
+        encode["sid"] = session_id
+    return tokens.encode_token(encode)
+
+
+def token_response(session: sessions.Session) -> dict:
+    token = create_access_token(
+        session.username,
+        session.user_id,
+        session.role,
+        timedelta(minutes=config.API_ACCESS_TOKEN_MINUTES),
+        session_id=session.family,
+    )
+    return {
+        "access_token": token,
+        "token_type": "bearer",
+        "refresh_token": session.refresh_token,
     }
-    return jwt.encode(encode, SECRET_KEY, ALGORITHM)
 
 
 async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
         user_role: str = payload.get("role")
@@ -78,7 +88,7 @@ async def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
                 detail="Could not validate user.",
             )
         return {"username": username, "id": user_id, "user_role": user_role}
-    except JWTError:
+    except tokens.JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Could not validate user."
         )
@@ -92,20 +102,23 @@ async def create_user(db: db_dependency, user: schemas.CreateUserRequest):
         first_name=user.first_name,
         last_name=user.last_name,
         role=user.role,
-        hashed_password=bcrypt_context.hash(user.password),
+        hashed_password=await hashing.hash_password(user.password),
         is_active=True,
         phone_number=user.phone_number,
     )
     db.add(user_model)
-    db.commit()
-    db.refresh(user_model)
+    await db.commit()
+    await db.refresh(user_model)
     return user_model
 
 
 @router.post("/token/", response_model=schemas.Token)
 async def login_access_token(
-    form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency
+    request: Request,
+    form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
+    db: db_dependency,
 ):
+    await check_login(request, form_data.username)
     user: models.Users | None = await authenticate_user(
         form_data.username, form_data.password, db
     )
@@ -115,8 +128,24 @@ async def login_access_token(
             detail="Could not validate credentials",
         )
 
-    token = create_access_token(
-        user.username, user.id, user.role, timedelta(minutes=20)
-    )
+    return token_response(await sessions.issue(db, user))
+
+
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_access_token(refresh: schemas.RefreshRequest, db: db_dependency):
+    """Trade a refresh token for a new access token and refresh token.
+
+    Each refresh token works once; presenting a used one again revokes every
+    token descended from the same login.
+    """
+    try:
+        session = await sessions.rotate(db, refresh.refresh_token)
+    except sessions.RotationRace:
+        session = None
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
 
-    return {"access_token": token, "token_type": "bearer"}
+    return token_response(session)
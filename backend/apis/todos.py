@@ -1,44 +1,100 @@
+from collections import Counter
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Response
+from fastapi import APIRouter, Depends, Header, HTTPException, Path, Query, Response
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, delete, insert, select, update
 from starlette import status
 from starlette.responses import RedirectResponse
 
-from .. import models, schemas
-from ..database import SessionLocal
+from .. import models, schemas, stats
+from ..cache import todo_lists
+from ..database import db_dependency, execute_returning
+from ..etags import bump_todo_version, make_etag, matches, not_modified, todo_version
+from ..filters import TodoFilters
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
+from ..search import search_todos
 from .auth import get_current_user
 
 router = APIRouter(tags=["todos_api"])
 
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+@router.get("/", response_model=schemas.TodoPage, status_code=status.HTTP_200_OK)
+async def read_all(
+    user: user_dependency,
+    db: db_dependency,
+    response: Response,
+    filters: Annotated[TodoFilters, Depends()],
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    if_none_match: str | None = Header(default=None),
+):
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+    owner_id = user.get("id", None)
+    version = await todo_version(db, owner_id)
+    variant = ("page", limit, cursor, filters.cache_key())
+    etag = make_etag(owner_id, version, *variant)
+    if matches(if_none_match, etag):
+        return not_modified(etag)
 
+    # keyed by version too, so a write on another worker is never served stale
+    page = todo_lists.get(owner_id, (version, *variant))
+    if page is None:
+        page = await paginate(
+            db,
+            filters.apply(
+                select(*models.Todos.__table__.c).where(
+                    models.Todos.owner_id == owner_id
+                )
+            ),
+            filters.keys,
+            limit,
+            cursor,
+            filters.descending,
+        )
+        todo_lists.set(owner_id, (version, *variant), page)
+    response.headers["ETag"] = etag
+    return page
 
-db_dependency = Annotated[Session, Depends(get_db)]
-user_dependency = Annotated[dict, Depends(get_current_user)]
 
+@router.get(
+    "/search",
+    response_model=schemas.TodoSearchResults,
+    status_code=status.HTTP_200_OK,
+)
+async def search(
+    user: user_dependency,
+    db: db_dependency,
+    q: str = Query(min_length=1, max_length=200),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+):
+    """Best matches for ``q`` in the user's todo titles and descriptions."""
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+
+    return {"items": await search_todos(db, user.get("id"), q, limit)}
 
-@router.get("/", status_code=status.HTTP_200_OK)
-async def read_all(user: user_dependency, db: db_dependency):
+
+@router.get("/stats", response_model=schemas.TodoStats, status_code=status.HTTP_200_OK)
+async def read_stats(user: user_dependency, db: db_dependency):
+    """The user's todo counts, read from ``todo_stats`` in one lookup."""
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
         )
 
-    return (
-        db.query(models.Todos)
-        .filter(models.Todos.owner_id == user.get("id", None))
-        .all()
-    )
+    return await stats.owner_stats(db, user.get("id"))
 
 
 @router.get(
@@ -49,7 +105,9 @@ async def read_all(user: user_dependency, db: db_dependency):
 async def read_todo(
     user: user_dependency,
     db: db_dependency,
+    response: Response,
     todo_id: int = Path(gt=0, title="The ID of the todo to read"),
+    if_none_match: str | None = Header(default=None),
 ):
     if user is None:
         raise HTTPException(
@@ -57,12 +115,18 @@ async def read_todo(
             detail="Could not validate credentials",
         )
 
-    todo_model = (
-        db.query(models.Todos)
-        .filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id"))
-        .first()
+    version = await todo_version(db, user.get("id"))
+    etag = make_etag(user.get("id"), version, "todo", todo_id)
+    if matches(if_none_match, etag):
+        return not_modified(etag)
+
+    todo_model = await db.scalar(
+        select(models.Todos).where(
+            models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")
+        )
     )
     if todo_model is not None:
+        response.headers["ETag"] = etag
         return todo_model
     raise HTTPException(status_code=404, detail="Todo not found")
 
@@ -83,11 +147,130 @@ async def create_todo(
 
     todo_model = models.Todos(**todo.model_dump(), owner_id=user.get("id", None))
     db.add(todo_model)
-    db.commit()
-    db.refresh(todo_model)
+    await stats.apply(db, todo_model.owner_id, stats.change(None, todo_model))
+    await bump_todo_version(db, todo_model.owner_id)
+    await db.commit()
+    await db.refresh(todo_model)
+    todo_lists.invalidate(todo_model.owner_id)
     return todo_model
 
 
+@router.post(
+    "/batch",
+    response_model=schemas.TodoBatchResponse,
+    status_code=status.HTTP_200_OK,
+)
+async def batch_todos(
+    user: user_dependency, db: db_dependency, batch: schemas.TodoBatchRequest
+):
+    """Apply many creates, updates and deletes in a single transaction.
+
+    Operations are grouped into one statement per kind: one ownership lock,
+    one multi-row INSERT, one executemany UPDATE and one DELETE, followed by
+    a single commit. Updates and deletes refer to todos that already exist;
+    ids the user does not own are reported as 404 without failing the batch.
+    The result is the same as applying the operations in the order given: an
+    update or delete of a todo deleted earlier in the batch is a 404 too.
+    """
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+
+    owner_id = user.get("id")
+    operations = batch.operations
+
+    referenced = {operation.id for operation in operations if operation.op != "create"}
+    # the current state of each referenced todo the user owns, by id
+    owned = {}
+    if referenced:
+        owned = await stats.locked(db, owner_id, referenced)
+    delta = Counter()
+
+    # walk the operations in order; the statements below then only run the
+    # updates and deletes that succeed, which gives the same end state
+    statuses = []
+    updates = []
+    deletes = set()
+    for operation in operations:
+        if operation.op == "create":
+            delta.update(stats.counts(operation.todo))
+            statuses.append(status.HTTP_201_CREATED)
+        elif operation.id not in owned:
+            statuses.append(status.HTTP_404_NOT_FOUND)
+        elif operation.op == "update":
+            delta.update(stats.change(owned[operation.id], operation.todo))
+            owned[operation.id] = operation.todo
+            updates.append({"todo_id": operation.id, **operation.todo.model_dump()})
+            statuses.append(status.HTTP_204_NO_CONTENT)
+        else:
+            delta.update(stats.change(owned.pop(operation.id), None))
+            deletes.add(operation.id)
+            statuses.append(status.HTTP_204_NO_CONTENT)
+
+    creates = [
+        {**operation.todo.model_dump(), "owner_id": owner_id}
+        for operation in operations
+        if operation.op == "create"
+    ]
+    created_ids = []
+    dialect = db.get_bind().dialect
+    if creates and dialect.insert_executemany_returning_sort_by_parameter_order:
+        created_ids = list(
+            await db.scalars(
+                insert(models.Todos).returning(
+                    models.Todos.id, sort_by_parameter_order=True
+                ),
+                creates,
+            )
+        )
+    elif creates:
+        # MySQL can't return the ids of a multi-row INSERT: one INSERT per todo
+        for values in creates:
+            result = await db.execute(insert(models.Todos).values(values))
+            created_ids.append(result.inserted_primary_key[0])
+
+    updates = [values for values in updates if values["todo_id"] not in deletes]
+    if updates:
+        todos = models.Todos.__table__
+        await db.execute(
+            update(todos)
+            .where(todos.c.id == bindparam("todo_id"), todos.c.owner_id == owner_id)
+            .values(
+                title=bindparam("title"),
+                description=bindparam("description"),
+                priority=bindparam("priority"),
+                completed=bindparam("completed"),
+            ),
+            updates,
+        )
+
+    if deletes:
+        await db.execute(
+            delete(models.Todos).where(
+                models.Todos.id.in_(deletes), models.Todos.owner_id == owner_id
+            )
+        )
+
+    await stats.apply(db, owner_id, delta)
+    await bump_todo_version(db, owner_id)
+    await db.commit()
+    todo_lists.invalidate(owner_id)
+
+    created = iter(created_ids)
+    return {
+        "results": [
+            {
+                "op": operation.op,
+                "id": next(created) if operation.op == "create" else operation.id,
+                "status": result_status,
+            }
+            for operation, result_status in zip(operations, statuses)
+        ]
+    }
+
+
 @router.put("/{todo_id}/", status_code=status.HTTP_204_NO_CONTENT)
 async def update_todo(
     user: user_dependency,
@@ -101,20 +284,61 @@ async def update_todo(
             detail="Could not validate credentials",
         )
 
-    todo_model = (
-        db.query(models.Todos)
-        .filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id"))
-        .first()
+    before = await stats.counted(db, user.get("id"), todo_id)
+    if before is None:
+        raise HTTPException(status_code=404, detail="Todo not found")
+
+    await db.execute(
+        update(models.Todos)
+        .where(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id"))
+        .values(**todo.model_dump())
     )
-    if todo_model is not None:
-        todo_model.title = todo.title
-        todo_model.description = todo.description
-        todo_model.priority = todo.priority
-        todo_model.completed = todo.completed
-        db.add(todo_model)
-        db.commit()
-        db.refresh(todo_model)
-        return
+    await stats.apply(db, user.get("id"), stats.change(before, todo))
+    await bump_todo_version(db, user.get("id"))
+    await db.commit()
+    todo_lists.invalidate(user.get("id"))
+
+
+@router.patch(
+    "/{todo_id}/", response_model=schemas.TodoResponse, status_code=status.HTTP_200_OK
+)
+async def patch_todo(
+    user: user_dependency,
+    db: db_dependency,
+    todo: schemas.TodoPatch,
+    todo_id: int = Path(gt=0, title="The ID of the todo to update"),
+):
+    """Update only the fields sent, returning the todo in the same statement.
+
+    Only a change to ``completed`` or ``priority`` reads the todo first, to
+    update the owner's counts.
+    """
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+        )
+
+    before = None
+    if todo.model_fields_set & {"completed", "priority"}:
+        before = await stats.counted(db, user.get("id"), todo_id)
+        if before is None:
+            raise HTTPException(status_code=404, detail="Todo not found")
+
+    updated = await execute_returning(
+        db,
+        update(models.Todos)
+        .where(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id"))
+        .values(**todo.model_dump(exclude_unset=True)),
+        *models.Todos.__table__.c,
+    )
+    if updated is not None:
+        if before is not None:
+            await stats.apply(db, user.get("id"), stats.change(before, updated))
+        await bump_todo_version(db, user.get("id"))
+        await db.commit()
+        todo_lists.invalidate(user.get("id"))
+        return updated._mapping
     raise HTTPException(status_code=404, detail="Todo not found")
 
 
@@ -130,13 +354,18 @@ async def delete_todo(
             detail="Could not validate credentials",
         )
 
-    todo_model = (
-        db.query(models.Todos)
-        .filter(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id"))
-        .first()
+    deleted = await execute_returning(
+        db,
+        delete(models.Todos).where(
+            models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")
+        ),
+        models.Todos.completed,
+        models.Todos.priority,
     )
-    if todo_model is not None:
-        db.delete(todo_model)
-        db.commit()
+    if deleted is not None:
+        await stats.apply(db, user.get("id"), stats.change(deleted, None))
+        await bump_todo_version(db, user.get("id"))
+        await db.commit()
+        todo_lists.invalidate(user.get("id"))
         return
     raise HTTPException(status_code=404, detail="Todo not found")
@@ -1,43 +1,37 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Path, Query
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
 from starlette import status
 
-from .. import models, schemas
-from ..database import SessionLocal
-from .auth import get_current_user
+from .. import hashing, models, schemas, sessions
+from ..database import db_dependency
+from .auth import get_current_user, token_response
 
 router = APIRouter(tags=["users_api"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
-bcrypt_context = CryptContext(
-    schemes=[
-        "bcrypt",
-    ],
-    deprecated="auto",
-)
 
 
-@router.get("/info/", status_code=status.HTTP_200_OK)
+@router.get(
+    "/info/", response_model=schemas.UserResponse, status_code=status.HTTP_200_OK
+)
 async def get_user(user: user_dependency, db: db_dependency):
     if user is None:
         return HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
 
-    return db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    columns = [
+        getattr(models.Users, field) for field in schemas.UserResponse.model_fields
+    ]
+    result = await db.execute(select(*columns).where(models.Users.id == user.get("id")))
+    user_model = result.mappings().first()
+    if user_model is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="user not found."
+        )
+    return user_model
 
 
 @router.post("/change-pass/", status_code=status.HTTP_202_ACCEPTED)
@@ -49,20 +43,19 @@ async def change_password(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
 
-    user_model = (
-        db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    user_model = await db.scalar(
+        select(models.Users).where(models.Users.id == user.get("id"))
     )
 
-    if not bcrypt_context.verify(userPass.password, user_model.hashed_password):
+    if not await hashing.verify_password(userPass.password, user_model.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Error on password Change."
         )
 
-    user_model.hashed_password = bcrypt_context.hash(userPass.new_password)
-    db.add(user_model)
-    db.commit()
-    db.refresh(user_model)
-    return
+    user_model.hashed_password = await hashing.hash_password(userPass.new_password)
+    # sessions started with the old password end; the caller gets a new one
+    await sessions.revoke_user(db, user_model.id)
+    return token_response(await sessions.issue(db, user_model))
 
 
 @router.put("/change-phone-number/", status_code=status.HTTP_202_ACCEPTED)
@@ -76,13 +69,13 @@ async def change_phone_number(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
 
-    user_model = (
-        db.query(models.Users).filter(models.Users.id == user.get("id")).first()
+    user_model = await db.scalar(
+        select(models.Users).where(models.Users.id == user.get("id"))
     )
 
     user_model.phone_number = userPhone.phone_number
 
     db.add(user_model)
-    db.commit()
-    db.refresh(user_model)
+    await db.commit()
+    await db.refresh(user_model)
     return
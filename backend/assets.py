@@ -0,0 +1,156 @@
+"""Fingerprinted, precompressed static assets.
+
+``python -m backend.assets`` copies every file under ``static/`` to
+``static/dist/`` with a content hash in its name (``styles.css`` becomes
+``styles.3f2a9c1b.css``), writes ``.gz`` and, when the optional ``brotli``
+package is installed, ``.br`` siblings for text assets, and records the names
+in ``static/dist/manifest.json``. Run it after the Tailwind build; ``npm run
+build`` in ``front_tailwind`` does both.
+
+Templates link assets with ``static_url("generics/css/styles.css")``, which
+resolves the hashed name from the manifest, or falls back to the plain file
+when nothing has been built. ``PrecompressedStaticFiles`` serves the hashed
+files with far-future ``immutable`` caching and picks the ``.br``/``.gz``
+sibling the client accepts.
+"""
+
+import functools
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from .config import BASE_DIR, templates
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+STATIC_DIR = BASE_DIR / "static"
+DIST_DIR = "dist"
+MANIFEST = "manifest.json"
+COMPRESSIBLE = {".css", ".js", ".json", ".html", ".svg", ".txt", ".xml", ".map"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+# preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def fingerprint(path: Path, content: bytes) -> str:
+    digest = hashlib.sha256(content).hexdigest()[:8]
+    return path.with_name(f"{path.stem}.{digest}{path.suffix}").as_posix()
+
+
+def compress(target: Path, content: bytes):
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(content):
+            target.with_name(target.name + suffix).write_bytes(compressed)
+
+
+def build(source: Path = STATIC_DIR) -> dict[str, str]:
+    """Fingerprint and compress ``source`` into ``source/dist``.
+
+    Returns the manifest: original path -> hashed path, both relative to
+    ``source``.
+    """
+    output = source / DIST_DIR
+    shutil.rmtree(output, ignore_errors=True)
+
+    entries = {}
+    for path in sorted(source.rglob("*")):
+        relative = path.relative_to(source)
+        if not path.is_file() or relative.parts[0] == DIST_DIR:
+            continue
+        content = path.read_bytes()
+        hashed = fingerprint(relative, content)
+        target = output / hashed
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+        if path.suffix in COMPRESSIBLE:
+            compress(target, content)
+        entries[relative.as_posix()] = f"{DIST_DIR}/{hashed}"
+
+    (output / MANIFEST).write_text(json.dumps(entries, indent=2, sort_keys=True))
+    manifest.cache_clear()
+    return entries
+
+
+@functools.cache
+def manifest() -> dict[str, str]:
+    try:
+        return json.loads((STATIC_DIR / DIST_DIR / MANIFEST).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def static_url(path: str) -> str:
+    path = path.lstrip("/")
+    return f"/static/{manifest().get(path, path)}"
+
+
+templates.globals["static_url"] = static_url
+
+
+def accepted_encodings(header: str) -> set[str]:
+    accepted = set()
+    for item in header.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = params.strip().removeprefix("q=")
+        try:
+            if params and float(quality) <= 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """``StaticFiles`` that serves built assets precompressed and immutable."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        relative = Path(full_path).relative_to(Path(self.directory).resolve())
+        if relative.parts[0] != DIST_DIR or relative.name == MANIFEST:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        request_headers = Headers(scope=scope)
+        accepted = accepted_encodings(request_headers.get("accept-encoding", ""))
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+        headers = {"Cache-Control": IMMUTABLE, "Vary": "Accept-Encoding"}
+
+        for coding, suffix in ENCODINGS:
+            compressed = f"{full_path}{suffix}"
+            if coding in accepted and os.path.isfile(compressed):
+                headers["Content-Encoding"] = coding
+                return FileResponse(
+                    compressed,
+                    status_code=status_code,
+                    headers=headers,
+                    media_type=media_type,
+                )
+
+        response = FileResponse(
+            full_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            headers=headers,
+            media_type=media_type,
+        )
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    built = build()
+    print(f"built {len(built)} assets into {STATIC_DIR / DIST_DIR}")
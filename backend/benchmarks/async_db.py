@@ -0,0 +1,93 @@
+"""Concurrent throughput of a blocking ``Session`` vs an ``AsyncSession``.
+
+Every handler in the app is an ``async def``; before the async engine they ran
+their queries through a sync ``Session``, which blocks the event loop for the
+whole query.  This benchmark replays both patterns against a throwaway SQLite
+file, with a ``sleep()`` SQL function standing in for a slow query, and prints
+the requests/sec each one sustains at the given concurrency.
+
+    python -m backend.benchmarks.async_db --requests 200 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+SLOW_QUERY = text("SELECT sleep(:delay)")
+
+
+def _sleep(seconds: float) -> float:
+    time.sleep(seconds)
+    return seconds
+
+
+def _register_sleep(dbapi_connection, connection_record):
+    dbapi_connection.create_function("sleep", 1, _sleep)
+
+
+async def blocking_handler(engine, delay: float):
+    with Session(engine) as db:
+        db.execute(SLOW_QUERY, {"delay": delay})
+
+
+async def async_handler(engine, delay: float):
+    async with AsyncSession(engine) as db:
+        await db.execute(SLOW_QUERY, {"delay": delay})
+
+
+async def measure(handler, engine, requests: int, concurrency: int, delay: float):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await handler(engine, delay)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int, concurrency: int, delay: float):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+
+        sync_engine = create_engine(
+            f"sqlite:///{path}", pool_size=concurrency, max_overflow=0
+        )
+        event.listen(sync_engine, "connect", _register_sleep)
+        async_engine = create_async_engine(
+            f"sqlite+aiosqlite:///{path}",
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=concurrency,
+            max_overflow=0,
+        )
+        event.listen(async_engine.sync_engine, "connect", _register_sleep)
+
+        before = await measure(
+            blocking_handler, sync_engine, requests, concurrency, delay
+        )
+        after = await measure(async_handler, async_engine, requests, concurrency, delay)
+
+        sync_engine.dispose()
+        await async_engine.dispose()
+
+    print(f"{requests} requests, concurrency {concurrency}, query time {delay}s")
+    print(f"  blocking Session : {before:10.1f} req/s")
+    print(f"  AsyncSession     : {after:10.1f} req/s")
+    print(f"  speedup          : {after / before:10.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.01)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.delay))
@@ -0,0 +1,324 @@
+"""Latency and throughput of the hot API endpoints against a seeded database.
+
+Migrates the database, seeds ``--users`` users and ``--todos`` todos through
+bulk inserts (skipped with ``--reuse`` when the database already holds data),
+then drives login, the todo list, create, update and the admin list
+in-process through ``ASGITransport`` at the given concurrency. Prints p50/p95/p99 latency and
+requests/sec per endpoint and writes them to ``--output`` as JSON; pass an
+earlier file as ``--baseline`` to exit non-zero when an endpoint got slower
+than ``--tolerance`` allows.
+
+    python -m backend.benchmarks.endpoints --users 10000 --todos 5000000 \\
+        --output bench.json --baseline previous.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime, timedelta
+
+PASSWORD = "benchmark-password"
+SEED_CHUNK = 10_000
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def seed(users: int, todos: int, reuse: bool) -> tuple[int, int]:
+    """Insert the dataset and return the user and todo counts benchmarked."""
+    from sqlalchemy import func, insert, select
+
+    from .. import hashing, models, stats
+    from ..database import SessionLocal, engine
+
+    async with engine.begin() as connection:
+        if reuse and await connection.scalar(select(func.count(models.Users.id))):
+            return (
+                await connection.scalar(select(func.count(models.Users.id))),
+                await connection.scalar(select(func.count(models.Todos.id))),
+            )
+
+    # every user shares one hash; hashing 10k passwords would dominate seeding
+    hashed_password = hashing.crypt_context().hash(PASSWORD)
+    start = time.perf_counter()
+    for first in range(1, users + 1, SEED_CHUNK):
+        rows = [
+            {
+                "username": f"user{i}",
+                "email": f"user{i}@example.com",
+                "first_name": "bench",
+                "last_name": "user",
+                "hashed_password": hashed_password,
+                "is_active": True,
+                "role": "admin" if i == 1 else "user",
+                "phone_number": "09000000000",
+            }
+            for i in range(first, min(first + SEED_CHUNK, users + 1))
+        ]
+        async with engine.begin() as connection:
+            await connection.execute(insert(models.Users), rows)
+
+    for first in range(0, todos, SEED_CHUNK):
+        rows = [
+            {
+                "title": f"todo number {i}",
+                "description": "seeded by the endpoint benchmark",
+                "priority": i % 5 + 1,
+                "completed": i % 3 == 0,
+                "owner_id": i % users + 1,
+            }
+            for i in range(first, min(first + SEED_CHUNK, todos))
+        ]
+        async with engine.begin() as connection:
+            await connection.execute(insert(models.Todos), rows)
+
+    # the bulk inserts skip the per-write stats upkeep; count them in one go
+    async with SessionLocal() as db:
+        await stats.rebuild(db)
+
+    print(
+        f"seeded {users} users and {todos} todos "
+        f"in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+    return users, todos
+
+
+def bearer(user) -> dict:
+    from ..apis.auth import create_access_token
+
+    token = create_access_token(user.username, user.id, user.role, timedelta(hours=1))
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def load_sample(size: int) -> tuple[list[dict], dict]:
+    """Return ``size`` random users with a token and one todo id each, and an
+    admin's token."""
+    from sqlalchemy import func, select
+
+    from .. import models
+    from ..database import engine
+
+    columns = (models.Users.id, models.Users.username, models.Users.role)
+    async with engine.connect() as connection:
+        admin = (
+            await connection.execute(
+                select(*columns).where(models.Users.role == "admin").limit(1)
+            )
+        ).first()
+        users = (
+            await connection.execute(
+                select(*columns).order_by(func.random()).limit(size)
+            )
+        ).all()
+        sample = []
+        for user in users:
+            todo_id = await connection.scalar(
+                select(func.min(models.Todos.id)).where(
+                    models.Todos.owner_id == user.id
+                )
+            )
+            sample.append(
+                {
+                    "username": user.username,
+                    "headers": bearer(user),
+                    "todo_id": todo_id,
+                }
+            )
+    return sample, {"headers": bearer(admin)}
+
+
+def workloads(sample: list[dict], admin: dict) -> dict:
+    todo = {
+        "title": "benchmark todo",
+        "description": "written by the endpoint benchmark",
+        "priority": 3,
+        "completed": False,
+    }
+    with_todos = [user for user in sample if user["todo_id"] is not None]
+
+    def login(client):
+        user = random.choice(sample)
+        return client.post(
+            "/api/auth/token/",
+            data={"username": user["username"], "password": PASSWORD},
+        )
+
+    def todo_list(client):
+        return client.get("/api/todos/", headers=random.choice(sample)["headers"])
+
+    def create_todo(client):
+        return client.post(
+            "/api/todos/", json=todo, headers=random.choice(sample)["headers"]
+        )
+
+    def update_todo(client):
+        user = random.choice(with_todos)
+        return client.put(
+            f"/api/todos/{user['todo_id']}/", json=todo, headers=user["headers"]
+        )
+
+    def admin_list(client):
+        return client.get("/api/admin/todo/", headers=admin["headers"])
+
+    return {
+        "login": login,
+        "todo_list": todo_list,
+        "create_todo": create_todo,
+        "update_todo": update_todo,
+        "admin_list": admin_list,
+    }
+
+
+async def measure(client, request, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": requests,
+        "errors": errors,
+        "requests_per_second": requests / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    found = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None:
+            continue
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            found.append(
+                f"{name}: p95 {previous['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms"
+            )
+        if current["requests_per_second"] < previous["requests_per_second"] * (
+            1 - tolerance
+        ):
+            found.append(
+                f"{name}: {previous['requests_per_second']:.1f} -> "
+                f"{current['requests_per_second']:.1f} req/s"
+            )
+    return found
+
+
+async def main(args) -> int:
+    # the app builds its engine from DATABASE_URL on import
+    os.environ["DATABASE_URL"] = args.database_url
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+    os.environ.setdefault("JWT_ALGORITHM", "HS256")
+    # every simulated login comes from one address; measure bcrypt, not the limiter
+    os.environ.setdefault("LOGIN_IP_BURST", "1e9")
+    os.environ.setdefault("LOGIN_USERNAME_BURST", "1e9")
+
+    from httpx import ASGITransport, AsyncClient
+
+    from .. import migrate, profiling
+    from ..database import engine
+    from ..hashing import pool as hashing_pool
+    from ..main import app
+
+    # slow-request warnings would drown the report under write contention
+    profiling.logger.setLevel(logging.ERROR)
+
+    # the schema the app runs against, search index and backfills included
+    migrate.upgrade(args.database_url, configure_logger=False)
+    users, todos = await seed(args.users, args.todos, args.reuse)
+    sample, admin = await load_sample(args.sample_users)
+
+    results = {}
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, request in workloads(sample, admin).items():
+            count = args.login_requests if name == "login" else args.requests
+            results[name] = await measure(client, request, count, args.concurrency)
+    hashing_pool.shutdown()
+    await engine.dispose()
+
+    print(f"{users} users, {todos} todos, concurrency {args.concurrency}")
+    for name, result in results.items():
+        print(
+            f"  {name:12}: {result['requests_per_second']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  "
+            f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}"
+        )
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "parameters": {
+            "users": users,
+            "todos": todos,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "login_requests": args.login_requests,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            found = regressions(results, json.load(file), args.tolerance)
+        for line in found:
+            print(f"regression: {line}", file=sys.stderr)
+        return 1 if found else 0
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--database-url",
+        default=f"sqlite:///{os.path.join(tempfile.gettempdir(), 'todo_bench.db')}",
+    )
+    parser.add_argument("--users", type=int, default=1_000)
+    parser.add_argument("--todos", type=int, default=100_000)
+    parser.add_argument("--reuse", action="store_true")
+    parser.add_argument("--sample-users", type=int, default=100)
+    parser.add_argument("--requests", type=int, default=1_000)
+    parser.add_argument("--login-requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--output")
+    parser.add_argument("--baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    sys.exit(asyncio.run(main(parser.parse_args())))
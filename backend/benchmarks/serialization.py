@@ -0,0 +1,66 @@
+"""Serialization cost of a todo list page.
+
+Compares the old path for list endpoints (ORM entities run through
+``jsonable_encoder`` and rendered by ``JSONResponse``) with the typed one
+(plain column rows validated by ``schemas.TodoPage`` and rendered by
+``ORJSONResponse``), at ``--rows`` rows per response.
+
+    python -m backend.benchmarks.serialization --rows 10000
+"""
+
+import argparse
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from .. import models, schemas
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {
+            "id": i,
+            "title": f"todo number {i}",
+            "description": "some description of the task",
+            "priority": i % 5 + 1,
+            "completed": i % 2 == 0,
+            "owner_id": i % 100 + 1,
+        }
+        for i in range(1, count + 1)
+    ]
+
+
+def orm_path(entities: list[models.Todos]) -> bytes:
+    return JSONResponse(jsonable_encoder(entities)).body
+
+
+def typed_path(rows: list[dict]) -> bytes:
+    page = schemas.TodoPage(items=rows, next_cursor=None)
+    return ORJSONResponse(page.model_dump(mode="json")).body
+
+
+def main(count: int, repeat: int):
+    rows = make_rows(count)
+    entities = [models.Todos(**row) for row in rows]
+
+    results = {
+        "ORM + jsonable_encoder + json": min(
+            timeit.repeat(lambda: orm_path(entities), number=1, repeat=repeat)
+        ),
+        "typed rows + orjson": min(
+            timeit.repeat(lambda: typed_path(rows), number=1, repeat=repeat)
+        ),
+    }
+
+    print(f"{count} rows, best of {repeat}")
+    for name, seconds in results.items():
+        print(f"  {name:30}: {seconds * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,101 @@
+"""In-process read-through cache for per-user todo lists.
+
+Entries are keyed by owner id and each one holds every cached variant of that
+owner's list (JSON pages, the HTML list), so a write only has to drop a single
+entry. Least recently used owners are evicted past ``maxsize``, and an owner's
+least recently used variants past ``max_variants``, since clients choose the
+cursors and filters that make up a variant. Entries expire after ``ttl``
+seconds, which also bounds staleness between workers.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from . import config, metrics
+
+
+class OwnerCache:
+    def __init__(self, maxsize: int, ttl: float, max_variants: int = 32):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_variants = max_variants
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Hashable, tuple[float, OrderedDict]] = OrderedDict()
+
+    def get(self, owner_id: Hashable, variant: Hashable) -> Any | None:
+        entry = self._entries.get(owner_id)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._entries[owner_id]
+            self.evictions += 1
+            entry = None
+
+        if entry is None or variant not in entry[1]:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(owner_id)
+        entry[1].move_to_end(variant)
+        self.hits += 1
+        return entry[1][variant]
+
+    def set(self, owner_id: Hashable, variant: Hashable, value: Any):
+        entry = self._entries.get(owner_id)
+        if entry is None or entry[0] < time.monotonic():
+            entry = (time.monotonic() + self.ttl, OrderedDict())
+            self._entries[owner_id] = entry
+        variants = entry[1]
+        variants[variant] = value
+        variants.move_to_end(variant)
+        self._entries.move_to_end(owner_id)
+
+        while len(variants) > self.max_variants:
+            variants.popitem(last=False)
+            self.evictions += 1
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, owner_id: Hashable):
+        self._entries.pop(owner_id, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "max_variants": self.max_variants,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+todo_lists = OwnerCache(
+    config.TODO_CACHE_SIZE, config.TODO_CACHE_TTL, config.TODO_CACHE_VARIANTS
+)
+
+metrics.Snapshot(
+    "todo_list_cache_requests_total",
+    "Todo list cache lookups by result.",
+    lambda: {("hit",): todo_lists.hits, ("miss",): todo_lists.misses},
+    ("result",),
+    kind="counter",
+)
+metrics.Snapshot(
+    "todo_list_cache_evictions_total",
+    "Todo list cache entries and variants dropped for size or age.",
+    lambda: {(): todo_lists.evictions},
+    kind="counter",
+)
+metrics.Snapshot(
+    "todo_list_cache_entries",
+    "Owners currently held in the todo list cache.",
+    lambda: {(): todo_lists.metrics()["size"]},
+)
@@ -2,16 +2,87 @@ import os
 from pathlib import Path
 
 from dotenv import load_dotenv
-from fastapi.templating import Jinja2Templates
 
 load_dotenv()
 
 DATABASE_URL = os.environ.get("DATABASE_URL")
 TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
 
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() in ("1", "true")
+
 JWT_SECRET_KEY = os.environ.get("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.environ.get("JWT_ALGORITHM")
 
+API_ACCESS_TOKEN_MINUTES = float(os.environ.get("API_ACCESS_TOKEN_MINUTES", 20))
+COOKIE_ACCESS_TOKEN_MINUTES = float(os.environ.get("COOKIE_ACCESS_TOKEN_MINUTES", 60))
+SESSION_RENEW_MINUTES = float(os.environ.get("SESSION_RENEW_MINUTES", 15))
+REFRESH_TOKEN_DAYS = float(os.environ.get("REFRESH_TOKEN_DAYS", 14))
+REFRESH_REUSE_GRACE_SECONDS = float(os.environ.get("REFRESH_REUSE_GRACE_SECONDS", 10))
+
+HASH_POOL_SIZE = int(os.environ.get("HASH_POOL_SIZE", os.cpu_count() or 1))
+HASH_QUEUE_LIMIT = int(os.environ.get("HASH_QUEUE_LIMIT", 64))
+BCRYPT_ROUNDS = int(os.environ.get("BCRYPT_ROUNDS", 12))
+
+TODO_CACHE_SIZE = int(os.environ.get("TODO_CACHE_SIZE", 1024))
+TODO_CACHE_TTL = float(os.environ.get("TODO_CACHE_TTL", 30))
+TODO_CACHE_VARIANTS = int(os.environ.get("TODO_CACHE_VARIANTS", 32))
+
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", 4096))
+TOKEN_CACHE_TTL = float(os.environ.get("TOKEN_CACHE_TTL", 300))
+
+LOGIN_IP_BURST = float(os.environ.get("LOGIN_IP_BURST", 20))
+LOGIN_IP_PER_MINUTE = float(os.environ.get("LOGIN_IP_PER_MINUTE", 10))
+LOGIN_USERNAME_BURST = float(os.environ.get("LOGIN_USERNAME_BURST", 10))
+LOGIN_USERNAME_PER_MINUTE = float(os.environ.get("LOGIN_USERNAME_PER_MINUTE", 5))
+LOGIN_RATE_LIMIT_SIZE = int(os.environ.get("LOGIN_RATE_LIMIT_SIZE", 10000))
+LOGIN_RATE_LIMIT_STORE = os.environ.get("LOGIN_RATE_LIMIT_STORE", "")
+
+WEB_BIND = os.environ.get("WEB_BIND", "0.0.0.0:8000")
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", os.cpu_count() or 1))
+WEB_MAX_REQUESTS = int(os.environ.get("WEB_MAX_REQUESTS", 10000))
+WEB_MAX_REQUESTS_JITTER = int(os.environ.get("WEB_MAX_REQUESTS_JITTER", 1000))
+WEB_TIMEOUT = int(os.environ.get("WEB_TIMEOUT", 60))
+WEB_GRACEFUL_TIMEOUT = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+WEB_KEEPALIVE = int(os.environ.get("WEB_KEEPALIVE", 5))
+
+WARMUP = os.environ.get("WARMUP", "true").lower() in ("1", "true")
+WARMUP_DB_CONNECTIONS = int(os.environ.get("WARMUP_DB_CONNECTIONS", DB_POOL_SIZE))
+
+DEBUG = os.environ.get("DEBUG", "false").lower() in ("1", "true")
+SQL_SLOW_REQUEST_MS = float(os.environ.get("SQL_SLOW_REQUEST_MS", 200))
+SQL_REPEAT_THRESHOLD = int(os.environ.get("SQL_REPEAT_THRESHOLD", 3))
+
+AUTH_EXEMPT_PATHS = tuple(
+    os.environ.get("AUTH_EXEMPT_PATHS", "/static/,/healthy/,/metrics").split(",")
+)
+
 
 BASE_DIR = Path(__file__).resolve().parent
-templates = Jinja2Templates(directory=f"{BASE_DIR}/templates")
+
+
+class LazyTemplates:
+    """``Jinja2Templates`` created on first use, keeping Jinja out of startup.
+
+    Globals set on ``globals`` before then are copied into the environment.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.globals: dict = {}
+        self._templates = None
+
+    def __getattr__(self, name: str):
+        if self._templates is None:
+            from fastapi.templating import Jinja2Templates
+
+            self._templates = Jinja2Templates(directory=self.directory)
+            self._templates.env.globals.update(self.globals)
+            self.globals = self._templates.env.globals
+        return getattr(self._templates, name)
+
+
+templates = LazyTemplates(directory=f"{BASE_DIR}/templates")
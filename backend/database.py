@@ -1,12 +1,144 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+import time
+from typing import Annotated
 
-from . import config
+from fastapi import Depends
+from sqlalchemy import exc, select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
-SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+from . import config, metrics, profiling
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# asyncio DBAPI drivers used in place of the sync ones from DATABASE_URL
+ASYNC_DRIVERS = {
+    "sqlite": "aiosqlite",
+    "postgresql": "asyncpg",
+    "mysql": "aiomysql",
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def async_database_url(url: str) -> str:
+    """Return ``url`` rewritten to use the asyncio driver of its backend."""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend in ASYNC_DRIVERS and url.get_driver_name() != ASYNC_DRIVERS[backend]:
+        url = url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+    return url.render_as_string(hide_password=False)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that also records how long checkouts wait for a connection."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self) -> dict:
+        return {
+            "size": self.size(),
+            "max_overflow": self._max_overflow,
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds": self.wait_seconds,
+            "max_wait_seconds": self.max_wait_seconds,
+        }
+
+
+SQLALCHEMY_DATABASE_URL = async_database_url(config.DATABASE_URL)
+
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=InstrumentedPool,
+    pool_size=config.DB_POOL_SIZE,
+    max_overflow=config.DB_MAX_OVERFLOW,
+    pool_timeout=config.DB_POOL_TIMEOUT,
+    pool_recycle=config.DB_POOL_RECYCLE,
+    pool_pre_ping=config.DB_POOL_PRE_PING,
+)
+
+metrics.instrument_engine(engine.sync_engine)
+profiling.instrument_engine(engine.sync_engine)
+
+SessionLocal = async_sessionmaker(
+    bind=engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
 
 Base = declarative_base()
+
+
+async def get_db():
+    async with SessionLocal() as db:
+        yield db
+
+
+db_dependency = Annotated[AsyncSession, Depends(get_db)]
+
+
+async def execute_returning(db: AsyncSession, stmt, *columns):
+    """Run an UPDATE or DELETE and return ``columns`` of the row it touched.
+
+    Uses ``RETURNING`` where the backend supports it, so the write and the read
+    are one round trip; elsewhere the row is selected by the statement's WHERE
+    clause. Returns ``None`` when no row matched.
+    """
+    stmt = stmt.execution_options(synchronize_session=False)
+    dialect = db.get_bind().dialect
+    if dialect.delete_returning if stmt.is_delete else dialect.update_returning:
+        return (await db.execute(stmt.returning(*columns))).first()
+
+    lookup = select(*columns).where(stmt.whereclause)
+    if stmt.is_delete:
+        row = (await db.execute(lookup)).first()
+        if row is not None:
+            await db.execute(stmt)
+        return row
+    if (await db.execute(stmt)).rowcount == 0:
+        return None
+    return (await db.execute(lookup)).first()
+
+
+def pool_stats() -> dict:
+    return engine.pool.stats()
+
+
+metrics.Snapshot(
+    "db_pool_connections",
+    "Connections of this worker's pool by state.",
+    lambda: {
+        (state,): pool_stats()[state]
+        for state in ("checked_in", "checked_out", "overflow")
+    },
+    ("state",),
+)
+metrics.Snapshot(
+    "db_pool_wait_seconds_total",
+    "Time spent waiting for a pooled connection.",
+    lambda: {(): pool_stats()["wait_seconds"]},
+    kind="counter",
+)
+metrics.Snapshot(
+    "db_pool_timeouts_total",
+    "Checkouts that gave up waiting for a pooled connection.",
+    lambda: {(): pool_stats()["timeouts"]},
+    kind="counter",
+)
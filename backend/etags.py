@@ -0,0 +1,67 @@
+"""Strong ETags for todo reads, derived from a per-owner change version.
+
+Every write to an owner's todos calls ``bump_todo_version`` in the same
+transaction, so ``todo_versions.version`` changes whenever anything the owner
+can read changes, on any worker. Reads look the version up by primary key and
+answer a matching ``If-None-Match`` with 304 before touching ``todos``.
+"""
+
+import hashlib
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+from starlette.responses import Response
+
+from .models import TodoVersions
+
+
+def _upsert(dialect: str, owner_id: int):
+    table = TodoVersions.__table__
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+
+        stmt = insert(table).values(owner_id=owner_id, version=1)
+        return stmt.on_duplicate_key_update(version=table.c.version + 1)
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    stmt = insert(table).values(owner_id=owner_id, version=1)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.owner_id], set_={"version": table.c.version + 1}
+    )
+
+
+async def bump_todo_version(db: AsyncSession, owner_id: int):
+    """Advance ``owner_id``'s version; call before committing a todo write."""
+    await db.execute(_upsert(db.get_bind().dialect.name, owner_id))
+
+
+async def todo_version(db: AsyncSession, owner_id: int) -> int:
+    version = await db.scalar(
+        select(TodoVersions.version).where(TodoVersions.owner_id == owner_id)
+    )
+    return version or 0
+
+
+def make_etag(owner_id: int, version: int, *variant) -> str:
+    """Return a strong ETag for one representation of an owner's todos."""
+    digest = hashlib.sha1(repr(variant).encode()).hexdigest()[:12]
+    return f'"{owner_id}-{version}-{digest}"'
+
+
+def matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip().removeprefix("W/")
+        if candidate in ("*", etag):
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
@@ -0,0 +1,77 @@
+"""Filtering and ordering of todo lists, applied in SQL.
+
+``TodoFilters`` is used as a dependency by the JSON and HTML list endpoints.
+Every predicate is on a column of the ``(owner_id, ...)`` indexes, and the
+ordering always ends in ``id`` so it is unique and can drive keyset pagination.
+Ordering by priority assumes priorities are set, which every write path
+enforces.
+"""
+
+from typing import Annotated, Literal
+from urllib.parse import urlencode
+
+from pydantic import BeforeValidator, Field
+from sqlalchemy import Select
+
+from . import models
+
+# HTML forms submit untouched fields as empty strings; treat them as unset
+Blank = BeforeValidator(lambda value: None if value == "" else value)
+Priority = Annotated[int, Field(gt=0, lt=6)]
+
+
+class TodoFilters:
+    def __init__(
+        self,
+        completed: Annotated[bool | None, Blank] = None,
+        priority_min: Annotated[Priority | None, Blank] = None,
+        priority_max: Annotated[Priority | None, Blank] = None,
+        order_by: Literal["id", "priority"] = "id",
+        direction: Literal["asc", "desc"] = "asc",
+    ):
+        self.completed = completed
+        self.priority_min = priority_min
+        self.priority_max = priority_max
+        self.order_by = order_by
+        self.direction = direction
+
+    def apply(self, stmt: Select) -> Select:
+        if self.completed is not None:
+            stmt = stmt.where(models.Todos.completed.is_(self.completed))
+        if self.priority_min is not None:
+            stmt = stmt.where(models.Todos.priority >= self.priority_min)
+        if self.priority_max is not None:
+            stmt = stmt.where(models.Todos.priority <= self.priority_max)
+        return stmt
+
+    @property
+    def keys(self) -> tuple:
+        if self.order_by == "priority":
+            return (models.Todos.priority, models.Todos.id)
+        return (models.Todos.id,)
+
+    @property
+    def descending(self) -> bool:
+        return self.direction == "desc"
+
+    def params(self) -> dict:
+        """The non-default query parameters, for cache keys and page links."""
+        params = {
+            "completed": self.completed,
+            "priority_min": self.priority_min,
+            "priority_max": self.priority_max,
+            "order_by": self.order_by if self.order_by != "id" else None,
+            "direction": self.direction if self.descending else None,
+        }
+        return {name: value for name, value in params.items() if value is not None}
+
+    def cache_key(self) -> tuple:
+        return tuple(sorted(self.params().items()))
+
+    def query_string(self) -> str:
+        return urlencode(
+            {
+                name: str(value).lower() if isinstance(value, bool) else value
+                for name, value in self.params().items()
+            }
+        )
@@ -0,0 +1,260 @@
+"""Password hashing off the event loop.
+
+bcrypt is deliberately CPU heavy, so every hash and verify is sent to a
+dedicated process pool instead of running inside an ``async def`` handler.
+The pool is bounded: once ``HASH_POOL_SIZE`` workers are busy and
+``HASH_QUEUE_LIMIT`` more calls are waiting, new calls are rejected with a 503
+rather than piling up behind a login burst.
+
+passlib is only imported by ``crypt_context``, which each pool process calls
+as it starts, so the app itself doesn't load it.
+
+Hashes use ``BCRYPT_ROUNDS``; a hash with a lower cost is replaced the next
+time its password is verified at login, and one with a higher cost is kept.
+``python -m backend.hashing`` times bcrypt on the host and records the most
+rounds that hash within a target.
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fastapi import HTTPException
+from starlette import status
+
+from . import config, metrics
+
+
+# below this, bcrypt is too cheap to slow down an offline attack meaningfully
+MIN_ROUNDS = 10
+MAX_ROUNDS = 31
+
+
+@functools.cache
+def crypt_context():
+    from passlib.context import CryptContext
+
+    rounds = config.BCRYPT_ROUNDS
+    # not bcrypt__rounds, which sets max_rounds too and so would downgrade
+    # stronger hashes; min_rounds alone makes needs_update flag weaker ones
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
+
+
+def _load_backend():
+    crypt_context().handler("bcrypt").get_backend()
+
+
+def _hash(password: str) -> tuple[str, float]:
+    start = time.process_time()
+    hashed = crypt_context().hash(password)
+    return hashed, time.process_time() - start
+
+
+def _verify(password: str, hashed_password: str) -> tuple[bool, float]:
+    start = time.process_time()
+    verified = crypt_context().verify(password, hashed_password)
+    return verified, time.process_time() - start
+
+
+def _verify_and_update(
+    password: str, hashed_password: str
+) -> tuple[tuple[bool, str | None], float]:
+    start = time.process_time()
+    result = crypt_context().verify_and_update(password, hashed_password)
+    return result, time.process_time() - start
+
+
+class HashingPool:
+    def __init__(self, max_workers: int, queue_limit: int):
+        self.max_workers = max_workers
+        self.queue_limit = queue_limit
+        self.in_flight = 0
+        self.stats = {
+            kind: {"count": 0, "rejected": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0}
+            for kind in ("hash", "verify")
+        }
+        self._executor: ProcessPoolExecutor | None = None
+
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, initializer=_load_backend
+            )
+        return self._executor
+
+    async def warm_up(self):
+        """Start every process of the pool, each loading the bcrypt backend."""
+        loop = asyncio.get_running_loop()
+        # one call per process, so every process starts whatever the start method
+        await asyncio.gather(
+            *(
+                loop.run_in_executor(self.executor(), time.process_time)
+                for _ in range(self.max_workers)
+            )
+        )
+
+    async def run(self, kind: str, fn, *args):
+        stats = self.stats[kind]
+        if self.in_flight >= self.max_workers + self.queue_limit:
+            stats["rejected"] += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, try again shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        self.in_flight += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            result, cpu_seconds = await loop.run_in_executor(self.executor(), fn, *args)
+        finally:
+            self.in_flight -= 1
+
+        elapsed = time.perf_counter() - start
+        stats["count"] += 1
+        stats["wall_seconds"] += elapsed
+        stats["cpu_seconds"] += cpu_seconds
+        metrics.password_hash_duration.observe((kind,), elapsed)
+        return result
+
+    def metrics(self) -> dict:
+        return {
+            "pool_size": self.max_workers,
+            "queue_limit": self.queue_limit,
+            "in_flight": self.in_flight,
+            **{kind: dict(stats) for kind, stats in self.stats.items()},
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+pool = HashingPool(config.HASH_POOL_SIZE, config.HASH_QUEUE_LIMIT)
+
+
+def share_cores(workers: int):
+    """Size the pool to one of ``workers`` server processes' share of the cores.
+
+    Called before the pool starts; an explicit ``HASH_POOL_SIZE`` is kept.
+    """
+    if "HASH_POOL_SIZE" not in os.environ:
+        pool.max_workers = max(1, (os.cpu_count() or 1) // workers)
+
+
+metrics.Snapshot(
+    "password_hash_cpu_seconds_total",
+    "CPU time spent by the hashing pool on bcrypt.",
+    lambda: {(kind,): stats["cpu_seconds"] for kind, stats in pool.stats.items()},
+    ("operation",),
+    kind="counter",
+)
+metrics.Snapshot(
+    "password_hash_rejected_total",
+    "bcrypt calls rejected with 503 because the hashing pool was saturated.",
+    lambda: {(kind,): stats["rejected"] for kind, stats in pool.stats.items()},
+    ("operation",),
+    kind="counter",
+)
+metrics.Snapshot(
+    "password_hash_in_flight",
+    "bcrypt calls running or queued in the hashing pool.",
+    lambda: {(): pool.in_flight},
+)
+
+
+async def hash_password(password: str) -> str:
+    return await pool.run("hash", _hash, password)
+
+
+async def verify_password(password: str, hashed_password: str) -> bool:
+    return await pool.run("verify", _verify, password, hashed_password)
+
+
+async def verify_and_update(
+    password: str, hashed_password: str
+) -> tuple[bool, str | None]:
+    """Verify ``password``, also returning a new hash if ``hashed_password``'s
+    cost is out of date (None otherwise)."""
+    verified, new_hash = await pool.run(
+        "verify", _verify_and_update, password, hashed_password
+    )
+    if new_hash is not None:
+        metrics.password_rehashed.inc()
+    return verified, new_hash
+
+
+def time_rounds(rounds: int, samples: int = 3) -> float:
+    """Return the median seconds a hash with ``rounds`` takes here."""
+    from passlib.hash import bcrypt
+
+    handler = bcrypt.using(rounds=rounds)
+    durations = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        handler.hash("calibration password")
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+def calibrate(target_seconds: float) -> tuple[int, dict[int, float]]:
+    """Return the most rounds, from ``MIN_ROUNDS`` up, hashing within
+    ``target_seconds`` on this host, and the time measured for each tried."""
+    timings = {}
+    for rounds in range(MIN_ROUNDS, MAX_ROUNDS + 1):
+        timings[rounds] = time_rounds(rounds)
+        if timings[rounds] > target_seconds:
+            break
+    within = [
+        rounds for rounds, seconds in timings.items() if seconds <= target_seconds
+    ]
+    return max(within, default=MIN_ROUNDS), timings
+
+
+def main(target_ms: float, env_file: str, dry_run: bool) -> int:
+    rounds, timings = calibrate(target_ms / 1000)
+    for tried, seconds in timings.items():
+        print(f"  {tried:>2} rounds {seconds * 1000:8.1f}ms")
+    if timings[rounds] > target_ms / 1000:
+        print(f"even {MIN_ROUNDS} rounds take longer than {target_ms:g}ms here")
+    print(f"BCRYPT_ROUNDS = {rounds} (was {config.BCRYPT_ROUNDS})")
+    if not dry_run:
+        from dotenv import set_key
+
+        set_key(env_file, "BCRYPT_ROUNDS", str(rounds), quote_mode="never")
+        print(f"recorded in {env_file}; restart the app to use it")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Pick BCRYPT_ROUNDS from how long bcrypt takes on this host."
+    )
+    parser.add_argument(
+        "--target-ms",
+        type=float,
+        default=250,
+        help="longest a single hash may take (250)",
+    )
+    parser.add_argument(
+        "--env-file",
+        default=str(config.BASE_DIR / ".env"),
+        help="where to record the rounds (backend/.env)",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="only print the rounds chosen"
+    )
+    args = parser.parse_args()
+    sys.exit(main(args.target_ms, args.env_file, args.dry_run))
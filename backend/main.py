@@ -1,28 +1,58 @@
-from typing import Annotated
+from contextlib import asynccontextmanager
 
-from fastapi import Depends, FastAPI, Request, Response
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from . import startup  # first, so its clock starts before the other imports
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import HTMLResponse, ORJSONResponse, PlainTextResponse
 from starlette.middleware.authentication import AuthenticationMiddleware
-from starlette.staticfiles import StaticFiles
 
+from . import config, metrics, profiling, warmup
+from .assets import PrecompressedStaticFiles
 from .apis import admin as admin_api
 from .apis import auth as auth_api
 from .apis import todos as todos_api
 from .apis import users as users_api
+from .hashing import pool as hashing_pool
 from .config import BASE_DIR, templates
-from .database import SessionLocal, engine
-from .models import Base
+from .database import engine
+from .sessions import SessionRenewalMiddleware
 from .routers import admin, auth, todos, users
 
-app: FastAPI = FastAPI()
+startup.mark("imports")
 
-app.add_middleware(AuthenticationMiddleware, backend=auth.JWTAuthenticationBackend())
+metrics.Snapshot(
+    "app_startup_seconds",
+    "Time this worker spent starting, by phase.",
+    lambda: {(phase,): seconds for phase, seconds in startup.phases.items()},
+    ("phase",),
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # the schema is managed by the migrations (python -m backend.migrate)
+    if config.WARMUP:
+        await warmup.run()
+    startup.mark("lifespan")
+    startup.report()
+    yield
+    hashing_pool.shutdown()
+    await engine.dispose()
+
+
+app: FastAPI = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 
-Base.metadata.create_all(bind=engine)
+app.add_middleware(AuthenticationMiddleware, backend=auth.JWTAuthenticationBackend())
+app.add_middleware(SessionRenewalMiddleware)
+app.add_middleware(profiling.QueryProfilerMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 
-app.mount("/static", StaticFiles(directory=f"{BASE_DIR}/static"), name="static")
+app.mount(
+    "/static",
+    PrecompressedStaticFiles(directory=f"{BASE_DIR}/static"),
+    name="static",
+)
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -35,6 +65,11 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 app.include_router(auth.router)
 app.include_router(todos.router)
 app.include_router(admin.router)
@@ -45,13 +80,4 @@ app.include_router(users_api.router, prefix="/api/users")
 app.include_router(auth_api.router, prefix="/api/auth")
 app.include_router(todos_api.router, prefix="/api/todos")
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
+startup.mark("app")
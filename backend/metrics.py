@@ -0,0 +1,225 @@
+"""In-process Prometheus metrics.
+
+Collectors are plain dicts updated from the event loop thread, so recording a
+value is a dict lookup and an add with no locking. Every worker process keeps
+and serves its own values; Prometheus scrapes each worker and sums them.
+"""
+
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Callable
+
+from sqlalchemy import event
+
+# ASGI scope of the request being handled, used to label database activity
+current_scope: ContextVar[dict | None] = ContextVar("current_scope", default=None)
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+HASH_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0, 5.0)
+
+registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: tuple = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+        registry.append(self)
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self.values.items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: tuple = (), buckets=()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # per label set: [count per bucket (last one is +Inf)..., sum]
+        self.values: dict[tuple, list] = {}
+        registry.append(self)
+
+    def observe(self, labels: tuple, value: float):
+        series = self.values.get(labels)
+        if series is None:
+            series = self.values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self):
+        for labels, series in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    _labels(self.labelnames, labels, f'le="{bound}"'),
+                    cumulative,
+                )
+            yield f"{self.name}_sum", _labels(self.labelnames, labels), series[-1]
+            yield f"{self.name}_count", _labels(self.labelnames, labels), cumulative
+
+
+class Snapshot:
+    """Values owned by another component, read from ``collect`` at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], dict],
+        labelnames: tuple = (),
+        kind: str = "gauge",
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+        self.labelnames = labelnames
+        self.kind = kind
+        registry.append(self)
+
+    def samples(self):
+        for labels, value in self.collect().items():
+            yield self.name, _labels(self.labelnames, labels), value
+
+
+def render() -> str:
+    lines = []
+    for metric in registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
+
+
+http_requests = Counter(
+    "http_requests_total",
+    "HTTP requests by route and status code.",
+    ("method", "route", "status"),
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route"),
+    REQUEST_BUCKETS,
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled."
+)
+db_queries = Counter(
+    "db_queries_total", "SQL statements executed by route.", ("route",)
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds",
+    "SQL statement latency by route.",
+    ("route",),
+    QUERY_BUCKETS,
+)
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds",
+    "Wall time of bcrypt hash/verify calls, including time queued for the pool.",
+    ("operation",),
+    HASH_BUCKETS,
+)
+password_rehashed = Counter(
+    "password_rehashed_total",
+    "Passwords rehashed at login because their bcrypt cost was out of date.",
+)
+login_rate_limited = Counter(
+    "login_rate_limited_total",
+    "Login attempts rejected with 429, by the limit that ran out.",
+    ("limit",),
+)
+
+
+def route_label(scope: dict | None) -> str:
+    route = scope.get("route") if scope is not None else None
+    return getattr(route, "path", "other")
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        token = current_scope.set(scope)
+        http_requests_in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            http_requests_in_flight.dec()
+            current_scope.reset(token)
+            route = route_label(scope)
+            http_requests.inc((scope["method"], route, str(status_code)))
+            http_request_duration.observe((scope["method"], route), elapsed)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    route = route_label(current_scope.get())
+    db_queries.inc((route,))
+    db_query_duration.observe((route,), elapsed)
+
+
+def _handle_error(context):
+    if context.connection is not None and context.connection.info.get(
+        "query_start_time"
+    ):
+        context.connection.info["query_start_time"].pop()
+
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,48 @@
+"""Bring the database schema up to date with the Alembic migrations.
+
+The app never creates tables itself, so workers start without touching the
+schema and can't race each other creating it. Run this once per deploy,
+before starting the workers::
+
+    python -m backend.migrate          # upgrade to head
+    python -m backend.migrate <rev>    # or to a given revision
+
+A database from before the migrations managed the schema (only ``users`` and
+``todos``, created at startup, and no ``alembic_version``) is marked as being
+at the phone number revision, then upgraded to create everything since::
+
+    cd backend && alembic stamp 6600cbd1ad3b && cd ..
+    python -m backend.migrate
+"""
+
+import argparse
+
+from .config import BASE_DIR
+
+
+def alembic_config(url: str | None = None, configure_logger: bool = True):
+    """Return the Alembic config of ``backend/alembic.ini``.
+
+    ``url`` replaces ``DATABASE_URL``; ``configure_logger`` set to False keeps
+    the ini file's logging setup from replacing the caller's.
+    """
+    from alembic.config import Config
+
+    alembic_cfg = Config(str(BASE_DIR / "alembic.ini"))
+    alembic_cfg.attributes["url"] = url
+    alembic_cfg.attributes["configure_logger"] = configure_logger
+    return alembic_cfg
+
+
+def upgrade(
+    url: str | None = None, revision: str = "head", configure_logger: bool = True
+):
+    from alembic import command
+
+    command.upgrade(alembic_config(url, configure_logger), revision)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("revision", nargs="?", default="head")
+    upgrade(revision=parser.parse_args().revision)
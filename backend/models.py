@@ -1,4 +1,4 @@
-from sqlalchemy import Boolean, Column, ForeignKey, Integer, String
+from sqlalchemy import Boolean, Column, Float, ForeignKey, Index, Integer, String
 
 from .database import Base
 
@@ -26,3 +26,49 @@ class Todos(Base):
     priority = Column(Integer)
     completed = Column(Boolean, default=False)
     owner_id = Column(Integer, ForeignKey("users.id"))
+
+    __table_args__ = (
+        Index("ix_todos_owner_id_id", "owner_id", "id"),
+        Index(
+            "ix_todos_owner_id_completed_priority", "owner_id", "completed", "priority"
+        ),
+        Index("ix_todos_owner_id_priority_id", "owner_id", "priority", "id"),
+    )
+
+
+class TodoVersions(Base):
+    """Per-owner counter bumped in the same transaction as every todo write."""
+
+    __tablename__ = "todo_versions"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class TodoStats(Base):
+    """Per-owner todo counts, updated in the same transaction as every todo write."""
+
+    __tablename__ = "todo_stats"
+
+    owner_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    priority_1 = Column(Integer, nullable=False, default=0)
+    priority_2 = Column(Integer, nullable=False, default=0)
+    priority_3 = Column(Integer, nullable=False, default=0)
+    priority_4 = Column(Integer, nullable=False, default=0)
+    priority_5 = Column(Integer, nullable=False, default=0)
+
+
+class RefreshTokens(Base):
+    """Refresh tokens by SHA-256 digest; each rotation adds a row to the family."""
+
+    __tablename__ = "refresh_tokens"
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String(64), unique=True, nullable=False)
+    family = Column(String(32), nullable=False, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    expires_at = Column(Float, nullable=False)
+    rotated_at = Column(Float)
+    revoked = Column(Boolean, nullable=False, default=False)
@@ -0,0 +1,86 @@
+"""Keyset (cursor) pagination.
+
+A page is selected with ``WHERE (sort key) > (last key of the previous page)``
+instead of OFFSET, so reading page 1000 costs the same as reading page 1. The
+cursor handed back to the client is an opaque, url-safe encoding of that key.
+"""
+
+import base64
+import json
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette import status
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _fits(value, key) -> bool:
+    """Whether ``value`` can be compared with the column ``key``."""
+    column = key.expression
+    if value is None:
+        return bool(column.nullable)
+    python_type = column.type.python_type
+    # bool is an int subclass, but true is not an id
+    if isinstance(value, bool) != (python_type is bool):
+        return False
+    if python_type is float:
+        return isinstance(value, (int, float))
+    return isinstance(value, python_type)
+
+
+def decode_cursor(cursor: str, keys: tuple) -> list:
+    """Return the key values in ``cursor``, checked against the ``keys`` columns.
+
+    A cursor that doesn't decode, or doesn't hold one value of the right type
+    per key, is a 400 rather than a database error.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        values = None
+    if (
+        not isinstance(values, list)
+        or len(values) != len(keys)
+        or not all(map(_fits, values, keys))
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor."
+        )
+    return values
+
+
+async def paginate(
+    db: AsyncSession,
+    stmt: Select,
+    keys: tuple,
+    limit: int,
+    cursor: str | None,
+    descending: bool = False,
+) -> dict:
+    """Return one page of ``stmt`` ordered by the unique column tuple ``keys``.
+
+    ``stmt`` selects plain columns (not entities); items come back as dicts.
+    """
+    limit = min(limit, MAX_PAGE_SIZE)
+    if cursor is not None:
+        last = tuple_(*decode_cursor(cursor, keys))
+        stmt = stmt.where(tuple_(*keys) < last if descending else tuple_(*keys) > last)
+
+    order = [key.desc() for key in keys] if descending else keys
+    result = await db.execute(stmt.order_by(*order).limit(limit + 1))
+    rows = [dict(row) for row in result.mappings()]
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1][key.key] for key in keys])
+    return {"items": rows, "next_cursor": next_cursor}
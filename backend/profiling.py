@@ -0,0 +1,139 @@
+"""Per-request SQL profiling.
+
+Engine cursor events add every statement a request runs to a ``QueryProfile``
+held in a context variable; SQLAlchemy's greenlets inherit it from the request
+task. When the request finishes, ``QueryProfilerMiddleware`` logs requests
+whose statements took longer than ``SQL_SLOW_REQUEST_MS`` in total and
+statements repeated ``SQL_REPEAT_THRESHOLD`` times or more (usually an N+1
+loop). With ``DEBUG`` on, the numbers are also returned in a ``Server-Timing``
+header.
+"""
+
+import logging
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from . import config
+
+logger = logging.getLogger(__name__)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND_PARAMETER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(statement: str) -> str:
+    """Return ``statement`` on one line with literals and IN lists collapsed."""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _BIND_PARAMETER.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _PLACEHOLDER_LIST.sub("(?, ...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+class QueryProfile:
+    def __init__(self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement = None
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, elapsed: float):
+        self.count += 1
+        self.total_seconds += elapsed
+        self.statements[statement] += 1
+        if elapsed >= self.slowest_seconds:
+            self.slowest_seconds = elapsed
+            self.slowest_statement = statement
+
+    def repeated(self, threshold: int) -> dict[str, int]:
+        return {
+            normalize_sql(statement): count
+            for statement, count in self.statements.items()
+            if count >= threshold
+        }
+
+    def server_timing(self) -> str:
+        return (
+            f'db;dur={self.total_seconds * 1000:.2f};desc="{self.count} queries", '
+            f"db-slowest;dur={self.slowest_seconds * 1000:.2f}"
+        )
+
+
+current_profile: ContextVar[QueryProfile | None] = ContextVar(
+    "current_profile", default=None
+)
+
+
+class QueryProfilerMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        profile = QueryProfile()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and config.DEBUG:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", profile.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        token = current_profile.set(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_profile.reset(token)
+            report(scope, profile)
+
+
+def report(scope: dict, profile: QueryProfile):
+    request = f"{scope['method']} {scope['path']}"
+    if profile.count and profile.total_seconds * 1000 >= config.SQL_SLOW_REQUEST_MS:
+        logger.warning(
+            "slow SQL in %s: %d statements, %.1f ms total, slowest %.1f ms: %s",
+            request,
+            profile.count,
+            profile.total_seconds * 1000,
+            profile.slowest_seconds * 1000,
+            normalize_sql(profile.slowest_statement),
+        )
+    for statement, count in profile.repeated(config.SQL_REPEAT_THRESHOLD).items():
+        logger.warning(
+            "possible N+1 in %s: statement ran %d times: %s", request, count, statement
+        )
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_profile.get() is not None:
+        conn.info.setdefault("profile_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    if profile is not None and conn.info.get("profile_start_time"):
+        elapsed = time.perf_counter() - conn.info["profile_start_time"].pop()
+        profile.record(statement, elapsed)
+
+
+def _handle_error(context):
+    if context.connection is not None and context.connection.info.get(
+        "profile_start_time"
+    ):
+        context.connection.info["profile_start_time"].pop()
+
+
+def instrument_engine(sync_engine):
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
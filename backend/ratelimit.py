@@ -0,0 +1,192 @@
+"""Token-bucket rate limiting of login attempts.
+
+Every login runs a bcrypt verify, so a client retrying passwords can keep the
+hashing pool busy for everyone. Each attempt takes a token from the bucket of
+the client's address and then from the bucket of the username tried; a bucket
+holds ``burst`` tokens and regains ``per_minute`` of them a minute. An attempt
+finding either bucket empty is rejected with 429 before the user is looked up.
+
+Buckets live in memory per worker, in an LRU bounded to ``maxsize`` keys. A
+bucket left alone long enough to refill is the same as no bucket, so those are
+dropped too. Setting ``LOGIN_RATE_LIMIT_STORE`` to a file path keeps buckets in
+a SQLite database instead, which every worker on the host shares.
+"""
+
+import asyncio
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+from starlette import status
+
+from . import config, metrics
+
+
+class RateLimiter:
+    def __init__(self, name: str, burst: float, per_minute: float, maxsize: int):
+        self.name = name
+        self.burst = burst
+        self.rate = per_minute / 60
+        self.maxsize = maxsize
+        self.evictions = 0
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    @property
+    def idle_seconds(self) -> float:
+        """How long an empty bucket takes to fill up again."""
+        return self.burst / self.rate
+
+    def refill(self, bucket: tuple[float, float] | None, now: float):
+        """Take a token from ``bucket`` (``(tokens, updated)``, None when new).
+
+        Returns the bucket's new state and how many seconds to wait before
+        retrying, 0 if a token was taken.
+        """
+        if bucket is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+        if tokens >= 1:
+            return (tokens - 1, now), 0.0
+        return (tokens, now), (1 - tokens) / self.rate
+
+    async def take(self, key: str) -> float:
+        now = time.monotonic()
+        while self._buckets:
+            oldest = next(iter(self._buckets.values()))
+            if oldest[1] + self.idle_seconds > now:
+                break
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+
+        bucket, retry_after = self.refill(self._buckets.pop(key, None), now)
+        self._buckets[key] = bucket
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+            self.evictions += 1
+        return retry_after
+
+    def clear(self):
+        self._buckets.clear()
+
+    def metrics(self) -> dict:
+        return {
+            "size": len(self._buckets),
+            "maxsize": self.maxsize,
+            "evictions": self.evictions,
+        }
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """Buckets kept in a SQLite file, so every worker on the host shares them.
+
+    Each attempt reads and writes its bucket in one ``BEGIN IMMEDIATE``
+    transaction, which serializes workers taking from the same budget. Idle
+    buckets are deleted every ``SWEEP_EVERY`` attempts.
+    """
+
+    SWEEP_EVERY = 1000
+
+    def __init__(self, name: str, burst: float, per_minute: float, path: str):
+        super().__init__(name, burst, per_minute, maxsize=0)
+        self.path = path
+        self._attempts = 0
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def connection(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS rate_limit_buckets ("
+                "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            self._connection = connection
+        return self._connection
+
+    def _take(self, key: str) -> float:
+        key = f"{self.name}:{key}"
+        with self._lock:
+            connection = self.connection()
+            now = time.time()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                bucket = connection.execute(
+                    "SELECT tokens, updated FROM rate_limit_buckets WHERE key = ?",
+                    (key,),
+                ).fetchone()
+                bucket, retry_after = self.refill(bucket, now)
+                connection.execute(
+                    "INSERT INTO rate_limit_buckets (key, tokens, updated) "
+                    "VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE "
+                    "SET tokens = excluded.tokens, updated = excluded.updated",
+                    (key, *bucket),
+                )
+                self._attempts += 1
+                if self._attempts % self.SWEEP_EVERY == 0:
+                    self._sweep(now)
+                connection.execute("COMMIT")
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        return retry_after
+
+    def _sweep(self, now: float):
+        cursor = self.connection().execute(
+            "DELETE FROM rate_limit_buckets WHERE key LIKE ? AND updated < ?",
+            (f"{self.name}:%", now - self.idle_seconds),
+        )
+        self.evictions += cursor.rowcount
+
+    async def take(self, key: str) -> float:
+        return await asyncio.to_thread(self._take, key)
+
+    def clear(self):
+        with self._lock:
+            self.connection().execute(
+                "DELETE FROM rate_limit_buckets WHERE key LIKE ?", (f"{self.name}:%",)
+            )
+
+    def metrics(self) -> dict:
+        return {"store": self.path, "evictions": self.evictions}
+
+
+def make_limiter(name: str, burst: float, per_minute: float) -> RateLimiter:
+    if config.LOGIN_RATE_LIMIT_STORE:
+        return SQLiteRateLimiter(name, burst, per_minute, config.LOGIN_RATE_LIMIT_STORE)
+    return RateLimiter(name, burst, per_minute, config.LOGIN_RATE_LIMIT_SIZE)
+
+
+login_by_ip = make_limiter(
+    "login_ip", config.LOGIN_IP_BURST, config.LOGIN_IP_PER_MINUTE
+)
+login_by_username = make_limiter(
+    "login_username", config.LOGIN_USERNAME_BURST, config.LOGIN_USERNAME_PER_MINUTE
+)
+
+
+async def check_login(request: Request, username: str | None):
+    """Raise 429 if the client or the username has no login attempts left.
+
+    The username's bucket is only charged once the client's allowed the
+    attempt, so one client hammering a username can't also drain it.
+    """
+    client = request.client.host if request.client else "unknown"
+    limiter = login_by_ip
+    retry_after = await limiter.take(client)
+    if not retry_after:
+        limiter = login_by_username
+        retry_after = await limiter.take((username or "").casefold())
+    if retry_after:
+        metrics.login_rate_limited.inc((limiter.name,))
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, try again later.",
+            headers={"Retry-After": str(math.ceil(retry_after))},
+        )
@@ -1,25 +1,17 @@
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Path
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select
 from starlette import status
 
-from .. import models
-from ..database import SessionLocal
+from .. import models, stats
+from ..cache import todo_lists
+from ..database import db_dependency, execute_returning
+from ..etags import bump_todo_version
 from .auth import get_current_user
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-db_dependency = Annotated[Session, Depends(get_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
@@ -30,7 +22,7 @@ async def read_all(user: user_dependency, db: db_dependency):
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
 
-    return db.query(models.Todos).all()
+    return (await db.scalars(select(models.Todos))).all()
 
 
 @router.delete("/todo/{todo_id}/", status_code=status.HTTP_204_NO_CONTENT)
@@ -44,9 +36,17 @@ async def delete_todo(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication Failed."
         )
 
-    todo = db.query(models.Todos).filter(models.Todos.id == todo_id).first()
-    if todo is not None:
-        db.delete(todo)
-        db.commit()
+    deleted = await execute_returning(
+        db,
+        delete(models.Todos).where(models.Todos.id == todo_id),
+        models.Todos.owner_id,
+        models.Todos.completed,
+        models.Todos.priority,
+    )
+    if deleted is not None:
+        await stats.apply(db, deleted.owner_id, stats.change(deleted, None))
+        await bump_todo_version(db, deleted.owner_id)
+        await db.commit()
+        todo_lists.invalidate(deleted.owner_id)
         return
     raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="item not found.")
@@ -3,16 +3,17 @@ from typing import Optional
 
 from fastapi import APIRouter, Depends, Form, HTTPException, Request, Response
 from fastapi.security import OAuth2PasswordRequestForm
-from jose import JWTError, jwt
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.authentication import AuthCredentials, AuthenticationBackend, SimpleUser
 from starlette.responses import HTMLResponse, RedirectResponse
 
-from .. import config, models
+from .. import config, hashing, models, sessions, tokens
 from ..config import templates
-from ..database import SessionLocal
+from ..database import get_db
+from ..ratelimit import check_login
+from ..tokens import decode_token
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -20,16 +21,6 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 SECRET_KEY = config.JWT_SECRET_KEY
 ALGORITHM = config.JWT_ALGORITHM
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 
 class User(SimpleUser):
     def __init__(self, username: str, user_id: int):
@@ -42,8 +33,20 @@ class User(SimpleUser):
 
 
 class JWTAuthenticationBackend(AuthenticationBackend):
+    """Resolve the cookie user once per request.
+
+    The result is kept on ``request.state`` so handlers calling
+    ``get_current_user`` reuse it instead of decoding the token again.
+    """
+
     async def authenticate(self, request):
-        user = await get_current_user(request)
+        if request.url.path.startswith(config.AUTH_EXEMPT_PATHS):
+            return None
+        try:
+            user = await get_current_user(request)
+        except HTTPException:
+            user = None
+        request.state.current_user = user
         if user:
             return AuthCredentials(["authenticated"]), User(
                 user["username"], user["id"]
@@ -63,64 +66,89 @@ class LoginForm:
         self.password = form.get("password")
 
 
-def get_password_hash(password):
-    return bcrypt_context.hash(password)
+async def get_password_hash(password):
+    return await hashing.hash_password(password)
 
 
-def verify_password(plain_password, hashed_password):
-    return bcrypt_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await hashing.verify_password(plain_password, hashed_password)
 
 
-def authenticate_user(username: str, password: str, db):
-    user = db.query(models.Users).filter(models.Users.username == username).first()
+async def authenticate_user(username: str, password: str, db: AsyncSession):
+    user = await db.scalar(
+        select(models.Users).where(models.Users.username == username)
+    )
 
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    verified, new_hash = await hashing.verify_and_update(password, user.hashed_password)
+    if not verified:
         return False
+    if new_hash is not None:
+        user.hashed_password = new_hash
+        await db.commit()
     return user
 
 
 def create_access_token(
-    username: str, user_id: int, expires_delta: Optional[timedelta] = None
+    username: str,
+    user_id: int,
+    expires_delta: Optional[timedelta] = None,
+    session_id: Optional[str] = None,
 ):
     encode = {"sub": username, "id": user_id}
+    if session_id is not None:
+        encode["sid"] = session_id
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     encode.update({"exp": expire})
-    return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+    return tokens.encode_token(encode)
+
+
+def set_session_cookies(response: Response, session: sessions.Session) -> str:
+    """Set the access and refresh cookies of ``session``; returns the access token."""
+    token = create_access_token(
+        session.username,
+        session.user_id,
+        expires_delta=timedelta(minutes=config.COOKIE_ACCESS_TOKEN_MINUTES),
+        session_id=session.family,
+    )
+    response.set_cookie(key="access_token", value=token, httponly=True)
+    sessions.set_refresh_cookie(response, session.refresh_token)
+    return token
 
 
 async def get_current_user(request: Request):
+    if hasattr(request.state, "current_user"):
+        return request.state.current_user
     try:
         token = request.cookies.get("access_token")
         if token is None:
             return None
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         username: str = payload.get("sub")
         user_id: int = payload.get("id")
         if username is None or user_id is None:
             logout(request)
         return {"username": username, "id": user_id}
-    except JWTError:
+    except tokens.JWTError:
         raise HTTPException(status_code=404, detail="Not found")
 
 
 @router.post("/token/")
 async def login_for_access_token(
+    request: Request,
     response: Response,
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    user = authenticate_user(form_data.username, form_data.password, db)
+    await check_login(request, form_data.username)
+    user = await authenticate_user(form_data.username, form_data.password, db)
     if not user:
         return False
-    token_expires = timedelta(minutes=60)
-    token = create_access_token(user.username, user.id, expires_delta=token_expires)
-
-    response.set_cookie(key="access_token", value=token, httponly=True)
+    set_session_cookies(response, await sessions.issue(db, user))
 
     return True
 
@@ -131,14 +159,14 @@ async def authentication_page(request: Request):
 
 
 @router.post("/", response_class=HTMLResponse)
-async def login(request: Request, db: Session = Depends(get_db)):
+async def login(request: Request, db: AsyncSession = Depends(get_db)):
     try:
         form = LoginForm(request)
         await form.create_oauth_form()
         response = RedirectResponse(url="/todos/", status_code=status.HTTP_302_FOUND)
 
         validate_user_cookie = await login_for_access_token(
-            response=response, form_data=form, db=db
+            request=request, response=response, form_data=form, db=db
         )
 
         if not validate_user_cookie:
@@ -147,7 +175,14 @@ async def login(request: Request, db: Session = Depends(get_db)):
                 "login.html", {"request": request, "msg": msg}
             )
         return response
-    except HTTPException:
+    except HTTPException as e:
+        if e.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+            return templates.TemplateResponse(
+                "login.html",
+                {"request": request, "msg": e.detail},
+                status_code=e.status_code,
+                headers=e.headers,
+            )
         msg = "Unknown Error"
         return templates.TemplateResponse(
             "login.html", {"request": request, "msg": msg}
@@ -155,11 +190,15 @@ async def login(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/logout/")
-async def logout(request: Request):
+async def logout(request: Request, db: AsyncSession = Depends(get_db)):
     response: Response = RedirectResponse(
         url="/auth/", status_code=status.HTTP_302_FOUND
     )
+    refresh_token = request.cookies.get(sessions.REFRESH_COOKIE)
+    if refresh_token is not None:
+        await sessions.revoke(db, refresh_token)
     response.delete_cookie(key="access_token")
+    response.delete_cookie(key=sessions.REFRESH_COOKIE)
     return response
 
 
@@ -177,13 +216,15 @@ async def register_user(
     lastname: str = Form(...),
     password: str = Form(...),
     password2: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
-    validation1 = (
-        db.query(models.Users).filter(models.Users.username == username).first()
+    validation1 = await db.scalar(
+        select(models.Users).where(models.Users.username == username)
     )
 
-    validation2 = db.query(models.Users).filter(models.Users.email == email).first()
+    validation2 = await db.scalar(
+        select(models.Users).where(models.Users.email == email)
+    )
 
     if password != password2 or validation1 is not None or validation2 is not None:
         msg = "Invalid registration request"
@@ -197,12 +238,12 @@ async def register_user(
     user_model.first_name = firstname
     user_model.last_name = lastname
 
-    hash_password = get_password_hash(password)
+    hash_password = await get_password_hash(password)
     user_model.hashed_password = hash_password
     user_model.is_active = True
 
     db.add(user_model)
-    db.commit()
+    await db.commit()
 
     msg = "User successfully created"
     return templates.TemplateResponse("login.html", {"request": request, "msg": msg})
@@ -217,12 +258,12 @@ async def change_password_page(request: Request):
 
 
 @router.get("/profile/", response_class=HTMLResponse)
-async def get_user_profile(request: Request, db: Session = Depends(get_db)):
+async def get_user_profile(request: Request, db: AsyncSession = Depends(get_db)):
     user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
-    profile = db.query(models.Users).filter(models.Users.id == user["id"]).first()
+    profile = await db.scalar(select(models.Users).where(models.Users.id == user["id"]))
 
     if profile is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
@@ -233,13 +274,15 @@ async def get_user_profile(request: Request, db: Session = Depends(get_db)):
 
 
 @router.get("/edit-profile/", response_class=HTMLResponse)
-async def edit_profile_page(request: Request, db: Session = Depends(get_db)):
+async def edit_profile_page(request: Request, db: AsyncSession = Depends(get_db)):
     user_data = await get_current_user(request)
     if user_data is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
     # Fetch full user details from the database
-    user = db.query(models.Users).filter(models.Users.id == user_data["id"]).first()
+    user = await db.scalar(
+        select(models.Users).where(models.Users.id == user_data["id"])
+    )
 
     return templates.TemplateResponse(
         "edit-profile.html", {"request": request, "user": user}
@@ -253,18 +296,20 @@ async def edit_profile(
     username: str = Form(...),
     firstname: str = Form(...),
     lastname: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     user_data = await get_current_user(request)
     if user_data is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
-    user = db.query(models.Users).filter(models.Users.id == user_data["id"]).first()
+    user = await db.scalar(
+        select(models.Users).where(models.Users.id == user_data["id"])
+    )
 
     # validating username and email for uniqueness
     if username != user.username:
-        validation = (
-            db.query(models.Users).filter(models.Users.username == username).first()
+        validation = await db.scalar(
+            select(models.Users).where(models.Users.username == username)
         )
         if validation is not None:
             return templates.TemplateResponse(
@@ -283,7 +328,9 @@ async def edit_profile(
             )
 
     if email != user.email:
-        validation = db.query(models.Users).filter(models.Users.email == email).first()
+        validation = await db.scalar(
+            select(models.Users).where(models.Users.email == email)
+        )
         if validation is not None:
             return templates.TemplateResponse(
                 "edit-profile.html",
@@ -305,7 +352,7 @@ async def edit_profile(
     user.first_name = firstname
     user.last_name = lastname
 
-    db.commit()
+    await db.commit()
 
     return templates.TemplateResponse(
         "edit-profile.html",
@@ -319,7 +366,7 @@ async def change_password(
     current_password: str = Form(...),
     new_password: str = Form(...),
     confirm_password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     user = await get_current_user(request)
     if user is None:
@@ -331,17 +378,23 @@ async def change_password(
             {"request": request, "error": "New passwords do not match"},
         )
 
-    user_model = db.query(models.Users).filter(models.Users.id == user["id"]).first()
-    if not verify_password(current_password, user_model.hashed_password):
+    user_model = await db.scalar(
+        select(models.Users).where(models.Users.id == user["id"])
+    )
+    if not await verify_password(current_password, user_model.hashed_password):
         return templates.TemplateResponse(
             "change-password.html",
             {"request": request, "error": "Current password is incorrect"},
         )
 
-    user_model.hashed_password = get_password_hash(new_password)
-    db.commit()
+    user_model.hashed_password = await get_password_hash(new_password)
+    # sessions started with the old password end; this browser gets a new one
+    await sessions.revoke_user(db, user_model.id)
+    session = await sessions.issue(db, user_model)
 
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "change-password.html",
         {"request": request, "success": "Password changed successfully"},
     )
+    set_session_cookies(response, session)
+    return response
@@ -1,12 +1,20 @@
-from fastapi import APIRouter, Depends, Form, Request
+from collections import Counter
+from types import SimpleNamespace
+
+from fastapi import APIRouter, Depends, Form, Query, Request
 from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, not_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from starlette.responses import RedirectResponse
 
+from .. import models, stats
+from ..cache import todo_lists
 from ..config import templates
-from ..database import SessionLocal
-from .. import models
+from ..database import execute_returning, get_db
+from ..etags import bump_todo_version, todo_version
+from ..filters import TodoFilters
+from ..pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, paginate
 from .auth import get_current_user
 
 router = APIRouter(
@@ -14,26 +22,88 @@ router = APIRouter(
 )
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+async def read_page(
+    db: AsyncSession,
+    owner_id: int,
+    filters: TodoFilters,
+    limit: int,
+    cursor: str | None,
+):
+    # keyed by version too, so a write on another worker is never served stale
+    version = await todo_version(db, owner_id)
+    variant = ("html", version, limit, cursor, filters.cache_key())
+    page = todo_lists.get(owner_id, variant)
+    if page is None:
+        page = await paginate(
+            db,
+            filters.apply(
+                select(*models.Todos.__table__.c).where(
+                    models.Todos.owner_id == owner_id
+                )
+            ),
+            filters.keys,
+            limit,
+            cursor,
+            filters.descending,
+        )
+        todo_lists.set(owner_id, variant, page)
+    return page
 
 
 @router.get("/", response_class=HTMLResponse)
-async def read_all_by_user(request: Request, db: Session = Depends(get_db)):
+async def read_all_by_user(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    filters: TodoFilters = Depends(),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    start: int = Query(default=0, ge=0),
+):
     user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
-    todos = db.query(models.Todos).filter(models.Todos.owner_id == user.get("id")).all()
+    page = await read_page(db, user.get("id"), filters, limit, cursor)
+
+    context = {
+        "request": request,
+        "todos": page["items"],
+        "next_cursor": page["next_cursor"],
+        "limit": limit,
+        "start": start,
+        "filters": filters,
+        "filter_query": filters.query_string(),
+        "paged": cursor is not None,
+    }
+    return templates.TemplateResponse("todos-list.html", context=context)
 
-    print(f"todos is : {todos}")
 
-    context = {"request": request, "todos": todos}
-    return templates.TemplateResponse("todos-list.html", context=context)
+@router.get("/rows/", response_class=HTMLResponse)
+async def read_rows_by_user(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    filters: TodoFilters = Depends(),
+    limit: int = Query(default=DEFAULT_PAGE_SIZE, gt=0, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    start: int = Query(default=0, ge=0),
+):
+    """Table rows of one page, appended to the list page as the user scrolls."""
+    user = await get_current_user(request)
+    if user is None:
+        return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
+
+    page = await read_page(db, user.get("id"), filters, limit, cursor)
+
+    context = {
+        "request": request,
+        "todos": page["items"],
+        "next_cursor": page["next_cursor"],
+        "limit": limit,
+        "start": start,
+        "filters": filters,
+        "filter_query": filters.query_string(),
+    }
+    return templates.TemplateResponse("todos-rows.html", context=context)
 
 
 @router.get("/add-todo/", response_class=HTMLResponse)
@@ -53,7 +123,7 @@ async def create_todo(
     title: str = Form(...),
     description: str = Form(...),
     priority: int = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     user = await get_current_user(request)
     if user is None:
@@ -67,18 +137,21 @@ async def create_todo(
     todo_model.owner_id = user.get("id")
 
     db.add(todo_model)
-    db.commit()
+    await stats.apply(db, todo_model.owner_id, stats.change(None, todo_model))
+    await bump_todo_version(db, todo_model.owner_id)
+    await db.commit()
+    todo_lists.invalidate(todo_model.owner_id)
 
     return RedirectResponse(url="/todos", status_code=status.HTTP_302_FOUND)
 
 
 @router.get("/edit-todo/{todo_id}/", response_class=HTMLResponse)
-async def edit_todo(request: Request, todo_id: int, db: Session = Depends(get_db)):
+async def edit_todo(request: Request, todo_id: int, db: AsyncSession = Depends(get_db)):
     user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
-    todo = db.query(models.Todos).filter(models.Todos.id == todo_id).first()
+    todo = await db.scalar(select(models.Todos).where(models.Todos.id == todo_id))
 
     context = {"request": request, "todo": todo, "user": user}
     return templates.TemplateResponse("edit-todo.html", context=context)
@@ -91,58 +164,75 @@ async def edit_todo_commit(
     title: str = Form(...),
     description: str = Form(...),
     priority: int = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
 ):
     user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
-    todo_model = db.query(models.Todos).filter(models.Todos.id == todo_id).first()
-
-    todo_model.title = title
-    todo_model.description = description
-    todo_model.priority = priority
-
-    db.add(todo_model)
-    db.commit()
+    before = await stats.counted(db, user.get("id"), todo_id)
+    if before is not None:
+        await db.execute(
+            update(models.Todos)
+            .where(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id"))
+            .values(title=title, description=description, priority=priority)
+        )
+        after = SimpleNamespace(completed=before.completed, priority=priority)
+        await stats.apply(db, user.get("id"), stats.change(before, after))
+        await bump_todo_version(db, user.get("id"))
+        await db.commit()
+        todo_lists.invalidate(user.get("id"))
 
     return RedirectResponse(url="/todos", status_code=status.HTTP_302_FOUND)
 
 
 @router.get("/delete/{todo_id}/")
-async def delete_todo(request: Request, todo_id: int, db: Session = Depends(get_db)):
+async def delete_todo(
+    request: Request, todo_id: int, db: AsyncSession = Depends(get_db)
+):
     user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
-    todo_model = (
-        db.query(models.Todos)
-        .filter(models.Todos.id == todo_id)
-        .filter(models.Todos.owner_id == user.get("id"))
-        .first()
+    deleted = await execute_returning(
+        db,
+        delete(models.Todos).where(
+            models.Todos.id == todo_id, models.Todos.owner_id == user.get("id")
+        ),
+        models.Todos.completed,
+        models.Todos.priority,
     )
-
-    if todo_model is None:
-        return RedirectResponse(url="/todos/", status_code=status.HTTP_302_FOUND)
-
-    db.query(models.Todos).filter(models.Todos.id == todo_id).delete()
-
-    db.commit()
+    if deleted is not None:
+        await stats.apply(db, user.get("id"), stats.change(deleted, None))
+        await bump_todo_version(db, user.get("id"))
+        await db.commit()
+        todo_lists.invalidate(user.get("id"))
 
     return RedirectResponse(url="/todos/", status_code=status.HTTP_302_FOUND)
 
 
 @router.get("/complete/{todo_id}/", response_class=HTMLResponse)
-async def complete_todo(request: Request, todo_id: int, db: Session = Depends(get_db)):
+async def complete_todo(
+    request: Request, todo_id: int, db: AsyncSession = Depends(get_db)
+):
     user = await get_current_user(request)
     if user is None:
         return RedirectResponse(url="/auth/", status_code=status.HTTP_302_FOUND)
 
-    todo = db.query(models.Todos).filter(models.Todos.id == todo_id).first()
-
-    todo.completed = not todo.completed
-
-    db.add(todo)
-    db.commit()
+    # flipped in SQL so concurrent toggles each apply instead of racing
+    toggled = await execute_returning(
+        db,
+        update(models.Todos)
+        .where(models.Todos.id == todo_id, models.Todos.owner_id == user.get("id"))
+        .values(completed=not_(models.Todos.completed)),
+        models.Todos.completed,
+    )
+    if toggled is not None:
+        await stats.apply(
+            db, user.get("id"), Counter(completed=1 if toggled.completed else -1)
+        )
+        await bump_todo_version(db, user.get("id"))
+        await db.commit()
+        todo_lists.invalidate(user.get("id"))
 
     return RedirectResponse(url="/todos/", status_code=status.HTTP_302_FOUND)
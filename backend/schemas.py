@@ -1,6 +1,6 @@
-from typing import Optional, Union
+from typing import Literal, Optional, Union
 
-from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from pydantic import BaseModel, ConfigDict, Field, ValidationError, model_validator
 
 
 class TodosRequest(BaseModel):
@@ -21,6 +21,111 @@ class TodosRequest(BaseModel):
     }
 
 
+class TodoPatch(BaseModel):
+    title: Optional[str] = Field(default=None, min_length=3)
+    description: Optional[str] = Field(default=None, min_length=3, max_length=100)
+    priority: Optional[int] = Field(default=None, gt=0, lt=6)
+    completed: Optional[bool] = None
+
+    model_config = {"json_schema_extra": {"example": {"completed": True}}}
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if not self.model_fields_set:
+            raise ValueError("at least one field is required")
+        for field in ("title", "priority", "completed"):
+            if field in self.model_fields_set and getattr(self, field) is None:
+                raise ValueError(f"{field} may not be null")
+        return self
+
+
+class TodoResponse(BaseModel):
+    id: int
+    title: str
+    description: Optional[str]
+    priority: Optional[int]
+    completed: Optional[bool]
+    owner_id: Optional[int]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TodoPage(BaseModel):
+    items: list[TodoResponse]
+    next_cursor: Optional[str]
+
+
+class TodoSearchResults(BaseModel):
+    items: list[TodoResponse]
+
+
+class TodoStats(BaseModel):
+    total: int
+    completed: int
+    by_priority: dict[int, int]
+
+
+class TodoStatsSummary(TodoStats):
+    owners: int
+
+
+class TodoBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[int] = Field(default=None, gt=0)
+    todo: Optional[TodosRequest] = None
+
+    @model_validator(mode="after")
+    def check_fields(self):
+        if self.op != "create" and self.id is None:
+            raise ValueError(f"{self.op} requires an id")
+        if self.op != "delete" and self.todo is None:
+            raise ValueError(f"{self.op} requires a todo")
+        return self
+
+
+class TodoBatchRequest(BaseModel):
+    operations: list[TodoBatchOperation] = Field(min_length=1, max_length=500)
+
+    model_config = {
+        "json_schema_extra": {
+            "example": {
+                "operations": [
+                    {
+                        "op": "create",
+                        "todo": {
+                            "title": "a new task",
+                            "description": "task description",
+                            "priority": 5,
+                            "completed": False,
+                        },
+                    },
+                    {
+                        "op": "update",
+                        "id": 1,
+                        "todo": {
+                            "title": "an old task",
+                            "description": "task description",
+                            "priority": 3,
+                            "completed": True,
+                        },
+                    },
+                    {"op": "delete", "id": 2},
+                ]
+            }
+        }
+    }
+
+
+class TodoBatchResult(BaseModel):
+    op: str
+    id: Optional[int]
+    status: int
+
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoBatchResult]
+
+
 class CreateUserRequest(BaseModel):
     username: str = Field(min_length=3, max_length=20)
     email: str = Field(min_length=6, max_length=100)
@@ -33,9 +138,27 @@ class CreateUserRequest(BaseModel):
     )
 
 
+class UserResponse(BaseModel):
+    id: int
+    username: Optional[str]
+    email: Optional[str]
+    first_name: Optional[str]
+    last_name: Optional[str]
+    role: Optional[str]
+    phone_number: Optional[str]
+    is_active: Optional[bool]
+
+    model_config = ConfigDict(from_attributes=True)
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str = Field(min_length=1)
 
 
 class UserVerificationPassword(BaseModel):
@@ -0,0 +1,148 @@
+"""Full-text search over todo titles and descriptions.
+
+SQLite keeps an FTS5 index in ``todos_fts``, an external-content table over
+``todos`` that triggers update on every insert, delete and title/description
+change. The owner id is indexed too, so a search intersects the user's postings
+with the query's inside the index instead of filtering every match by owner.
+Postgres uses a GIN index over the ``tsvector`` of the same text. Both are
+created by the Alembic migration, which also indexes the existing rows;
+``python -m backend.search`` recreates a missing index and rebuilds it from
+the ``todos`` table. Other backends fall back to ``LIKE``.
+"""
+
+import asyncio
+import re
+
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models
+
+SQLITE_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title, description, owner_id,
+        content='todos', content_rowid='id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts(rowid, title, description, owner_id)
+        VALUES (new.id, new.title, new.description, new.owner_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update
+    AFTER UPDATE OF title, description, owner_id ON todos BEGIN
+        INSERT INTO todos_fts(todos_fts, rowid, title, description, owner_id)
+        VALUES ('delete', old.id, old.title, old.description, old.owner_id);
+        INSERT INTO todos_fts(rowid, title, description, owner_id)
+        VALUES (new.id, new.title, new.description, new.owner_id);
+    END
+    """,
+)
+SQLITE_REBUILD = "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')"
+
+# the query below repeats this expression so the planner can match the index
+POSTGRES_VECTOR = (
+    "to_tsvector('english', coalesce(todos.title, '') || ' ' "
+    "|| coalesce(todos.description, ''))"
+)
+POSTGRES_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_todos_search ON todos "
+    f"USING GIN ({POSTGRES_VECTOR.replace('todos.', '')})",
+)
+POSTGRES_REBUILD = "REINDEX INDEX ix_todos_search"
+
+todos_fts = table("todos_fts", column("rowid"), column("todos_fts"))
+
+
+def fts5_query(q: str, owner_id: int) -> str | None:
+    """Return an FTS5 MATCH expression for the words in ``q``.
+
+    Words are quoted so user input can't inject FTS5 syntax, and the last one
+    matches as a prefix for search-as-you-type.
+    """
+    words = re.findall(r"\w+", q)
+    if not words:
+        return None
+    terms = " AND ".join(f'"{word}"' for word in words) + "*"
+    return f'owner_id : "{owner_id}" AND {{title description}} : ({terms})'
+
+
+def search_statement(dialect: str, owner_id: int, q: str):
+    """Return the ranked search query for ``dialect``, or None if ``q`` has
+    nothing to search for."""
+    columns = models.Todos.__table__.c
+
+    if dialect == "sqlite":
+        match = fts5_query(q, owner_id)
+        if match is None:
+            return None
+        rank = func.bm25(literal_column("todos_fts"), 10.0, 1.0, 0.0)
+        stmt = (
+            select(*columns)
+            .join(todos_fts, todos_fts.c.rowid == models.Todos.id)
+            .where(todos_fts.c.todos_fts.op("MATCH")(match))
+            .order_by(rank)
+        )
+    elif dialect == "postgresql":
+        query = func.websearch_to_tsquery(literal_column("'english'"), q)
+        vector = literal_column(POSTGRES_VECTOR)
+        stmt = (
+            select(*columns)
+            .where(models.Todos.owner_id == owner_id, vector.op("@@")(query))
+            .order_by(func.ts_rank(vector, query).desc())
+        )
+    else:
+        pattern = f"%{q}%"
+        stmt = (
+            select(*columns)
+            .where(
+                models.Todos.owner_id == owner_id,
+                or_(
+                    models.Todos.title.ilike(pattern),
+                    models.Todos.description.ilike(pattern),
+                ),
+            )
+            .order_by(models.Todos.id)
+        )
+    return stmt
+
+
+async def search_todos(
+    db: AsyncSession, owner_id: int, q: str, limit: int
+) -> list[dict]:
+    stmt = search_statement(db.get_bind().dialect.name, owner_id, q)
+    if stmt is None:
+        return []
+    result = await db.execute(stmt.limit(limit))
+    return [dict(row) for row in result.mappings()]
+
+
+async def rebuild():
+    """Create the search index if it is missing and backfill every todo."""
+    from .database import engine
+
+    async with engine.begin() as connection:
+        dialect = connection.dialect.name
+        if dialect == "sqlite":
+            statements = SQLITE_DDL + (SQLITE_REBUILD,)
+        elif dialect == "postgresql":
+            statements = POSTGRES_DDL + (POSTGRES_REBUILD,)
+        else:
+            statements = ()
+        for statement in statements:
+            await connection.execute(text(statement))
+    await engine.dispose()
+    return dialect
+
+
+if __name__ == "__main__":
+    print(f"rebuilt the todo search index ({asyncio.run(rebuild())})")
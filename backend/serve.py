@@ -0,0 +1,71 @@
+"""Production entry point: gunicorn forking uvicorn workers.
+
+``python -m backend.serve`` starts a gunicorn master that imports the app once
+(``preload_app``) and forks ``WEB_WORKERS`` uvicorn workers from it, sharing
+the imported code copy-on-write. Each worker warms up (``backend.warmup``)
+before it accepts connections, and is replaced after about
+``WEB_MAX_REQUESTS`` requests. Run ``python -m backend.migrate`` first.
+
+Signals go to the master. ``HUP`` replaces the workers gracefully, giving
+in-flight requests ``WEB_GRACEFUL_TIMEOUT`` seconds to finish; the replacements
+fork from the already imported code, so to deploy new code send ``USR2``,
+which starts a new master beside the old one, then ``TERM`` the old master
+once the new workers are up. ``TTIN`` and ``TTOU`` add and remove a worker.
+"""
+
+import logging
+
+from gunicorn.app.base import BaseApplication
+
+from . import config, startup
+
+
+def post_fork(server, worker):
+    from .database import engine
+
+    # the pool must not hand a worker connections opened before the fork
+    engine.sync_engine.dispose(close=False)
+    startup.reset_clock()
+
+    # the app's logs, startup and warm-up times included, go with gunicorn's
+    logger = logging.getLogger("backend")
+    logger.handlers = worker.log.error_log.handlers
+    logger.setLevel(worker.log.error_log.level)
+    logger.propagate = False
+
+
+def options() -> dict:
+    return {
+        "bind": config.WEB_BIND,
+        "workers": config.WEB_WORKERS,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": config.WEB_MAX_REQUESTS,
+        "max_requests_jitter": config.WEB_MAX_REQUESTS_JITTER,
+        "timeout": config.WEB_TIMEOUT,
+        "graceful_timeout": config.WEB_GRACEFUL_TIMEOUT,
+        "keepalive": config.WEB_KEEPALIVE,
+        "post_fork": post_fork,
+    }
+
+
+class Server(BaseApplication):
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        for name, value in self.options.items():
+            self.cfg.set(name, value)
+
+    def load(self):
+        from . import hashing
+        from .main import app
+
+        # otherwise every worker starts a hashing process per core
+        hashing.share_cores(self.cfg.workers)
+        return app
+
+
+if __name__ == "__main__":
+    Server(options()).run()
@@ -0,0 +1,288 @@
+"""Refresh tokens, rotated on every use, and silent renewal of the HTML cookie.
+
+A login issues a random refresh token next to the short-lived access token;
+trading it in at ``POST /api/auth/refresh`` (or, for the HTML app, letting
+``SessionRenewalMiddleware`` do it) returns a new pair without a bcrypt
+verify. Tokens are stored as SHA-256 digests, which is enough for 256 random
+bits and keeps the lookup a unique index probe.
+
+Each token can be used once: using it marks it rotated and issues the next
+token of the same family. A rotated token presented again means someone else
+holds a copy, so the whole family is revoked, including access tokens already
+issued from it. The exception is a reuse within
+``REFRESH_REUSE_GRACE_SECONDS``, which is what a browser sending parallel
+requests with the same cookie looks like; those just aren't renewed.
+
+Changing a password revokes every family of the user with
+``revoke_user``, so a stolen refresh token stops working, and starts a new
+session for the caller.
+
+Rotated tokens are kept until they expire so their reuse is still detected;
+expired and revoked ones are deleted every ``PRUNE_EVERY`` logins, or by
+``python -m backend.sessions``.
+"""
+
+import asyncio
+import hashlib
+import secrets
+import time
+from typing import NamedTuple
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.requests import Request
+from starlette.responses import Response
+
+from . import config, database
+from .models import RefreshTokens, Users
+from . import tokens
+from .tokens import decode_token, revoked_sessions
+
+REFRESH_COOKIE = "refresh_token"
+PRUNE_EVERY = 1000
+
+_issued = 0
+
+
+class RotationRace(Exception):
+    """The token was rotated moments ago, most likely by a parallel request."""
+
+
+class Session(NamedTuple):
+    user_id: int
+    username: str
+    role: str
+    family: str
+    refresh_token: str
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _add_token(db: AsyncSession, user_id: int, family: str) -> str:
+    token = secrets.token_urlsafe(32)
+    db.add(
+        RefreshTokens(
+            token_hash=hash_token(token),
+            family=family,
+            user_id=user_id,
+            expires_at=time.time() + config.REFRESH_TOKEN_DAYS * 86400,
+            revoked=False,
+        )
+    )
+    return token
+
+
+async def issue(db: AsyncSession, user: Users) -> Session:
+    """Start a new family for ``user`` and return its first refresh token."""
+    global _issued
+    family = secrets.token_hex(16)
+    token = _add_token(db, user.id, family)
+    _issued += 1
+    if _issued % PRUNE_EVERY == 0:
+        await prune(db)
+    await db.commit()
+    return Session(user.id, user.username, user.role, family, token)
+
+
+async def prune(db: AsyncSession) -> int:
+    """Delete refresh tokens that can no longer be used; the caller commits."""
+    result = await db.execute(
+        delete(RefreshTokens)
+        .where(or_(RefreshTokens.expires_at <= time.time(), RefreshTokens.revoked))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+async def revoke_family(db: AsyncSession, family: str):
+    await db.execute(
+        update(RefreshTokens)
+        .where(RefreshTokens.family == family)
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    revoked_sessions.add(family)
+
+
+async def revoke_user(db: AsyncSession, user_id: int):
+    """Revoke every family of ``user_id``; the caller commits."""
+    families = (
+        await db.scalars(
+            select(RefreshTokens.family)
+            .where(RefreshTokens.user_id == user_id, RefreshTokens.revoked.is_(False))
+            .distinct()
+        )
+    ).all()
+    await db.execute(
+        update(RefreshTokens)
+        .where(RefreshTokens.user_id == user_id)
+        .values(revoked=True)
+        .execution_options(synchronize_session=False)
+    )
+    for family in families:
+        revoked_sessions.add(family)
+
+
+async def rotate(db: AsyncSession, token: str) -> Session | None:
+    """Trade ``token`` for the next one of its family.
+
+    Returns None for a token that is unknown, expired or revoked, or whose
+    reuse just revoked its family, and raises ``RotationRace`` for a reuse
+    within the grace period.
+    """
+    now = time.time()
+    row = (
+        await db.execute(
+            select(RefreshTokens, Users.username, Users.role)
+            .join(Users, Users.id == RefreshTokens.user_id)
+            .where(RefreshTokens.token_hash == hash_token(token))
+        )
+    ).first()
+    if row is None:
+        return None
+    refresh, username, role = row
+    if refresh.revoked or refresh.expires_at <= now:
+        return None
+    if refresh.rotated_at is not None:
+        if now - refresh.rotated_at <= config.REFRESH_REUSE_GRACE_SECONDS:
+            raise RotationRace()
+        await revoke_family(db, refresh.family)
+        return None
+
+    # claimed by a conditional update so two concurrent uses can't both win
+    claimed = await db.execute(
+        update(RefreshTokens)
+        .where(RefreshTokens.id == refresh.id, RefreshTokens.rotated_at.is_(None))
+        .values(rotated_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        await db.rollback()
+        raise RotationRace()
+    new_token = _add_token(db, refresh.user_id, refresh.family)
+    await db.commit()
+    return Session(refresh.user_id, username, role, refresh.family, new_token)
+
+
+async def revoke(db: AsyncSession, token: str):
+    """Revoke the family of ``token``, if it is a known refresh token."""
+    family = await db.scalar(
+        select(RefreshTokens.family).where(
+            RefreshTokens.token_hash == hash_token(token)
+        )
+    )
+    if family is not None:
+        await revoke_family(db, family)
+
+
+def set_refresh_cookie(response: Response, token: str):
+    response.set_cookie(
+        key=REFRESH_COOKIE,
+        value=token,
+        max_age=int(config.REFRESH_TOKEN_DAYS * 86400),
+        httponly=True,
+        samesite="lax",
+    )
+
+
+def needs_renewal(access_token: str | None) -> bool:
+    if access_token is None:
+        return True
+    try:
+        payload = decode_token(access_token)
+    except tokens.JWTError:
+        return True
+    expires = payload.get("exp")
+    return expires is not None and expires - time.time() < (
+        config.SESSION_RENEW_MINUTES * 60
+    )
+
+
+class SessionRenewalMiddleware:
+    """Renew the HTML app's access cookie from its refresh cookie.
+
+    Runs before authentication: when the access cookie is missing, expired or
+    within ``SESSION_RENEW_MINUTES`` of expiring, the refresh token is rotated,
+    the request continues with the new access token and the response sets both
+    new cookies. A refresh token that can't be used is cleared.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(
+            ("/api/", *config.AUTH_EXEMPT_PATHS)
+        ):
+            return await self.app(scope, receive, send)
+
+        cookies = Request(scope).cookies
+        refresh_token = cookies.get(REFRESH_COOKIE)
+        if refresh_token is None or not needs_renewal(cookies.get("access_token")):
+            return await self.app(scope, receive, send)
+
+        try:
+            session = await self.renew(scope, refresh_token)
+        except RotationRace:
+            # the parallel request that won sets the new cookies
+            return await self.app(scope, receive, send)
+        renewed = Response()
+        if session is None:
+            renewed.delete_cookie(REFRESH_COOKIE)
+        else:
+            from .routers.auth import set_session_cookies
+
+            access_token = set_session_cookies(renewed, session)
+            cookies = {**cookies, "access_token": access_token}
+            scope = {
+                **scope,
+                "headers": [
+                    (name, value)
+                    for name, value in scope["headers"]
+                    if name != b"cookie"
+                ]
+                + [
+                    (
+                        b"cookie",
+                        "; ".join(f"{k}={v}" for k, v in cookies.items()).encode(),
+                    )
+                ],
+            }
+
+        set_cookies = [
+            header for header in renewed.raw_headers if header[0] == b"set-cookie"
+        ]
+
+        async def send_with_cookies(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + set_cookies
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookies)
+
+    async def renew(self, scope, refresh_token: str) -> Session | None:
+        # the same session source as the routes, so dependency overrides apply
+        get_db = scope["app"].dependency_overrides.get(database.get_db, database.get_db)
+        sessions = get_db()
+        try:
+            return await rotate(await anext(sessions), refresh_token)
+        finally:
+            await sessions.aclose()
+
+
+async def main() -> int:
+    from .database import SessionLocal, engine
+
+    async with SessionLocal() as db:
+        pruned = await prune(db)
+        await db.commit()
+    await engine.dispose()
+    print(f"deleted {pruned} expired or revoked refresh tokens")
+    return 0
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""How long a worker takes to start, by phase.
+
+``main`` marks the end of each phase: ``imports`` (importing the app's
+modules), ``app`` (building the app, its middleware and routes) and
+``lifespan`` (the lifespan's startup, which warms the worker up). The
+durations are logged once the app is serving and exported as
+``app_startup_seconds``. This module only imports the standard library so its
+clock starts before anything heavy is loaded.
+
+``python -m backend.startup`` starts the app in a fresh interpreter with
+``-X importtime`` and prints the phases with the import time spent in each
+top-level package, which is what to look at when cold starts get slower.
+"""
+
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+phases: dict[str, float] = {}
+_last = time.perf_counter()
+
+
+def mark(phase: str):
+    """Record the time since the previous mark as the duration of ``phase``."""
+    global _last
+    now = time.perf_counter()
+    phases[phase] = now - _last
+    _last = now
+
+
+def reset_clock():
+    """Time the next phase from now, in a worker forked from a preloaded master.
+
+    The earlier phases keep the master's times, which every worker shares.
+    """
+    global _last
+    _last = time.perf_counter()
+
+
+def report():
+    logger.info(
+        "started in %.3fs (%s)",
+        sum(phases.values()),
+        ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in phases.items()),
+    )
+
+
+STARTUP_SCRIPT = """
+import asyncio, json
+from backend import main, startup
+
+async def start():
+    async with main.app.router.lifespan_context(main.app):
+        pass
+
+asyncio.run(start())
+print(json.dumps(startup.phases))
+"""
+
+
+def import_times(stderr: str) -> Counter:
+    """Sum the ``-X importtime`` self times in ``stderr`` by top-level package."""
+    seconds = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:") :].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        package = fields[2].strip().split(".")[0]
+        seconds[package] += int(fields[0]) / 1e6
+    return seconds
+
+
+def main(top: int) -> int:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SCRIPT],
+        cwd=root,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        print(result.stderr, file=sys.stderr)
+        return result.returncode
+
+    print(f"process started and stopped in {elapsed:.3f}s")
+    for phase, seconds in json.loads(result.stdout.splitlines()[-1]).items():
+        print(f"  {phase:<10} {seconds:8.3f}s")
+
+    packages = import_times(result.stderr)
+    print(f"imports by package ({sum(packages.values()):.3f}s in total):")
+    for package, seconds in packages.most_common(top):
+        print(f"  {package:<20} {seconds:8.3f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--top", type=int, default=15, help="how many packages to list (15)"
+    )
+    sys.exit(main(parser.parse_args().top))
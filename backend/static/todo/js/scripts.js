@@ -0,0 +1,48 @@
+// Infinite scroll for the todo list: when the "Load more" link comes into
+// view, fetch the next page's rows and append them in place of the link.
+// Without JavaScript the link still works as a plain next-page link.
+(function () {
+  function watch(link) {
+    if (!link || !("IntersectionObserver" in window)) {
+      return;
+    }
+    const observer = new IntersectionObserver(function (entries) {
+      if (entries.some((entry) => entry.isIntersecting)) {
+        observer.disconnect();
+        load(link);
+      }
+    });
+    observer.observe(link);
+  }
+
+  function load(link) {
+    const row = link.closest("tr");
+    fetch(link.dataset.rows, { credentials: "same-origin" })
+      .then((response) => {
+        if (response.redirected) {
+          // the session ended and the rows were answered with the login page
+          window.location.assign(response.url);
+          return null;
+        }
+        if (!response.ok) {
+          throw new Error(response.statusText);
+        }
+        return response.text();
+      })
+      .then((html) => {
+        if (html === null) {
+          return;
+        }
+        row.insertAdjacentHTML("afterend", html);
+        row.remove();
+        watch(document.getElementById("load-more"));
+      })
+      .catch(() => {
+        // leave the plain link in place so the user can page manually
+      });
+  }
+
+  document.addEventListener("DOMContentLoaded", function () {
+    watch(document.getElementById("load-more"));
+  });
+})();
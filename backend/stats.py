@@ -0,0 +1,219 @@
+"""Per-owner todo counts kept in ``todo_stats``.
+
+Every write path works out how it changes an owner's counts from the todo's
+values before and after the write, and applies that delta with one upsert in
+the same transaction, so reading an owner's stats is a primary key lookup
+however many todos they have. ``python -m backend.stats`` recounts every owner
+from ``todos`` and replaces the table; ``--verify`` only reports owners whose
+counts drifted, and exits non-zero if any did.
+"""
+
+import argparse
+import asyncio
+import sys
+from collections import Counter
+
+from sqlalchemy import case, delete, func, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .models import TodoStats, Todos
+
+PRIORITIES = range(1, 6)
+COUNTS = ("total", "completed", *(f"priority_{p}" for p in PRIORITIES))
+
+
+def counts(todo) -> Counter:
+    """Return what ``todo`` (anything with ``completed`` and ``priority``)
+    adds to its owner's counts; nothing for ``None``."""
+    if todo is None:
+        return Counter()
+    contribution = Counter(total=1, completed=int(bool(todo.completed)))
+    if todo.priority in PRIORITIES:
+        contribution[f"priority_{todo.priority}"] = 1
+    return contribution
+
+
+def change(before, after) -> Counter:
+    """Return the change in counts when a todo goes from ``before`` to ``after``.
+
+    Either side may be ``None`` for a create or a delete.
+    """
+    delta = counts(after)
+    delta.subtract(counts(before))
+    return delta
+
+
+def _upsert(dialect: str, owner_id: int, delta: dict):
+    table = TodoStats.__table__
+    values = {"owner_id": owner_id, **{name: 0 for name in COUNTS}, **delta}
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert as dialect_insert
+
+        stmt = dialect_insert(table).values(values)
+        return stmt.on_duplicate_key_update(
+            {name: table.c[name] + delta[name] for name in delta}
+        )
+
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+
+    stmt = dialect_insert(table).values(values)
+    return stmt.on_conflict_do_update(
+        index_elements=[table.c.owner_id],
+        set_={name: table.c[name] + delta[name] for name in delta},
+    )
+
+
+async def locked(db: AsyncSession, owner_id: int, todo_ids) -> dict:
+    """Return the counted fields of the owner's todos among ``todo_ids`` by id,
+    locking them for the rest of the transaction.
+
+    An update can't return the values it replaced (``RETURNING`` reports the
+    new ones, and SQLite has no writable CTEs), so updates that change counted
+    fields read them first. The read is a no-op ``UPDATE`` rather than a
+    ``SELECT ... FOR UPDATE``, which SQLite ignores: every backend takes its
+    write lock before the values are read, and concurrent updates of the same
+    todo each count from the other's result.
+    """
+    where = (Todos.id.in_(todo_ids), Todos.owner_id == owner_id)
+    stmt = (
+        update(Todos)
+        .where(*where)
+        .values(completed=Todos.completed)
+        .execution_options(synchronize_session=False)
+    )
+    columns = (Todos.id, Todos.completed, Todos.priority)
+    if db.get_bind().dialect.update_returning:
+        rows = await db.execute(stmt.returning(*columns))
+    else:
+        await db.execute(stmt)
+        rows = await db.execute(select(*columns).where(*where))
+    return {row.id: row for row in rows}
+
+
+async def counted(db: AsyncSession, owner_id: int, todo_id: int):
+    """Return the counted fields of a todo about to be updated, or None."""
+    return (await locked(db, owner_id, [todo_id])).get(todo_id)
+
+
+async def apply(db: AsyncSession, owner_id: int | None, delta: Counter):
+    """Add ``delta`` to ``owner_id``'s counts; call before committing the write."""
+    delta = {name: value for name, value in delta.items() if value}
+    if owner_id is None or not delta:
+        return
+    await db.execute(_upsert(db.get_bind().dialect.name, owner_id, delta))
+
+
+async def owner_stats(db: AsyncSession, owner_id: int) -> dict:
+    row = await db.scalar(select(TodoStats).where(TodoStats.owner_id == owner_id))
+    return present({name: getattr(row, name, 0) for name in COUNTS})
+
+
+async def summary(db: AsyncSession) -> dict:
+    """Counts across every owner, summed over ``todo_stats`` rather than todos."""
+    columns = TodoStats.__table__.c
+    row = (
+        await db.execute(
+            select(
+                func.count().label("owners"),
+                *(
+                    func.coalesce(func.sum(columns[name]), 0).label(name)
+                    for name in COUNTS
+                ),
+            )
+        )
+    ).one()
+    return {"owners": row.owners, **present(row._mapping)}
+
+
+def present(row) -> dict:
+    return {
+        "total": row["total"],
+        "completed": row["completed"],
+        "by_priority": {p: row[f"priority_{p}"] for p in PRIORITIES},
+    }
+
+
+def recount():
+    """Select every owner's counts from ``todos``, shaped like ``todo_stats``."""
+    completed = case((Todos.completed.is_(True), 1), else_=0)
+    return (
+        select(
+            Todos.owner_id,
+            func.count().label("total"),
+            func.sum(completed).label("completed"),
+            *(
+                func.sum(case((Todos.priority == p, 1), else_=0)).label(f"priority_{p}")
+                for p in PRIORITIES
+            ),
+        )
+        .where(Todos.owner_id.is_not(None))
+        .group_by(Todos.owner_id)
+    )
+
+
+async def drifted(db: AsyncSession) -> list[dict]:
+    """Return the owners whose stored counts differ from a recount."""
+    columns = TodoStats.__table__.c
+    stored = {
+        row.owner_id: tuple(row[1:])
+        for row in await db.execute(
+            select(columns.owner_id, *(columns[n] for n in COUNTS))
+        )
+    }
+    expected = {row.owner_id: tuple(row[1:]) for row in await db.execute(recount())}
+    zeros = (0,) * len(COUNTS)
+    return [
+        {
+            "owner_id": owner_id,
+            "stored": dict(zip(COUNTS, stored.get(owner_id, zeros))),
+            "expected": dict(zip(COUNTS, expected.get(owner_id, zeros))),
+        }
+        for owner_id in sorted(stored.keys() | expected.keys())
+        if stored.get(owner_id, zeros) != expected.get(owner_id, zeros)
+    ]
+
+
+async def rebuild(db: AsyncSession):
+    """Replace every owner's counts with a recount from ``todos``.
+
+    Writes that commit while this runs can be lost on backends without
+    serializable isolation, so run it while the app is quiet and ``--verify``
+    afterwards.
+    """
+    await db.execute(delete(TodoStats))
+    await db.execute(insert(TodoStats).from_select(["owner_id", *COUNTS], recount()))
+    await db.commit()
+
+
+async def main(verify: bool) -> int:
+    from .database import SessionLocal, engine
+
+    async with SessionLocal() as db:
+        drift = await drifted(db)
+        for owner in drift:
+            print(
+                f"owner {owner['owner_id']}: stored {owner['stored']}, "
+                f"expected {owner['expected']}"
+            )
+        if not verify:
+            await rebuild(db)
+    await engine.dispose()
+
+    if verify:
+        print(f"{len(drift)} owners with drifted todo stats")
+        return 1 if drift else 0
+    print(f"rebuilt todo stats ({len(drift)} owners corrected)")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--verify",
+        action="store_true",
+        help="only report owners whose counts drifted; exit 1 if any did",
+    )
+    sys.exit(asyncio.run(main(parser.parse_args().verify)))
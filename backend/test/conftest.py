@@ -3,11 +3,27 @@ from typing import Callable
 import pytest
 from pydantic import BaseModel
 
+from ..cache import todo_lists
+from ..ratelimit import login_by_ip, login_by_username
 from ..models import Todos, Users
-from ..routers.auth import bcrypt_context
+from ..hashing import crypt_context
 from . import utils
 
 
+@pytest.fixture(autouse=True)
+def clear_todo_list_cache():
+    # fixtures write straight to the database, bypassing cache invalidation
+    todo_lists.clear()
+    yield
+    todo_lists.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_login_rate_limits():
+    login_by_ip.clear()
+    login_by_username.clear()
+
+
 @pytest.fixture
 def test_todo():
     todo = Todos(
@@ -33,7 +49,7 @@ def test_user():
     user = Users(
         username="testuser",
         email="testemail@test.com",
-        hashed_password=bcrypt_context.hash("testpass"),
+        hashed_password=crypt_context().hash("testpass"),
         role="admin",
         phone_number="1234567890",
     )
@@ -3,7 +3,8 @@ from httpx import AsyncClient
 
 from ..main import app
 from ..models import Todos
-from ..routers.admin import get_current_user, get_db
+from ..database import get_db
+from ..routers.admin import get_current_user
 from . import utils
 
 app.dependency_overrides[get_db] = utils.override_get_db
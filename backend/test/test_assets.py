@@ -0,0 +1,73 @@
+import gzip
+
+import pytest
+from fastapi import status
+from httpx import ASGITransport, AsyncClient
+
+from .. import assets
+
+CSS = b"body { color: red; }\n" * 100
+
+
+@pytest.fixture
+def static_dir(tmp_path, monkeypatch):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "styles.css").write_bytes(CSS)
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG")
+    monkeypatch.setattr(assets, "STATIC_DIR", tmp_path)
+    yield tmp_path
+    assets.manifest.cache_clear()
+
+
+def test_build_fingerprints_and_compresses(static_dir):
+    manifest = assets.build(static_dir)
+
+    hashed = manifest["css/styles.css"]
+    assert hashed.startswith("dist/css/styles.") and hashed.endswith(".css")
+    assert (static_dir / hashed).read_bytes() == CSS
+    assert gzip.decompress((static_dir / f"{hashed}.gz").read_bytes()) == CSS
+    assert not (static_dir / f"{manifest['logo.png']}.gz").exists()
+
+    assert assets.static_url("css/styles.css") == f"/static/{hashed}"
+    assert assets.static_url("/missing.js") == "/static/missing.js"
+
+
+def test_build_changes_name_with_content(static_dir):
+    before = assets.build(static_dir)["css/styles.css"]
+    (static_dir / "css" / "styles.css").write_bytes(CSS + b"a {}\n")
+    after = assets.build(static_dir)["css/styles.css"]
+
+    assert before != after
+    assert not (static_dir / before).exists()
+
+
+async def test_serves_precompressed_immutable_assets(static_dir):
+    hashed = assets.build(static_dir)["css/styles.css"]
+    transport = ASGITransport(app=assets.PrecompressedStaticFiles(directory=static_dir))
+
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.get(f"/{hashed}", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-type"].startswith("text/css")
+        assert "immutable" in response.headers["cache-control"]
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.content == CSS
+
+        response = await client.get(
+            f"/{hashed}", headers={"Accept-Encoding": "gzip;q=0"}
+        )
+        assert "content-encoding" not in response.headers
+        assert response.content == CSS
+
+        response = await client.get("/css/styles.css")
+        assert response.status_code == status.HTTP_200_OK
+        assert "cache-control" not in response.headers
+
+
+def test_accepted_encodings():
+    assert assets.accepted_encodings("gzip, deflate, br;q=0.5, zstd;q=0") == {
+        "gzip",
+        "deflate",
+        "br",
+    }
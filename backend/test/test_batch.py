@@ -0,0 +1,120 @@
+from fastapi import status
+from httpx import AsyncClient
+
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from ..models import Todos
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+
+
+async def test_batch_create_update_delete(test_todo):
+    db = utils.TestingSessionLocal()
+    db.add(Todos(title="not mine", description="desc", priority=1, owner_id=2))
+    db.commit()
+    db.close()
+
+    todo = {
+        "title": "batch todo",
+        "description": "some description",
+        "priority": 2,
+        "completed": False,
+    }
+    operations = [
+        {"op": "create", "todo": todo},
+        {"op": "update", "id": 1, "todo": {**todo, "completed": True}},
+        {"op": "delete", "id": 2},
+        {"op": "create", "todo": {**todo, "title": "second batch todo"}},
+    ]
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/api/todos/batch", json={"operations": operations}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "results": [
+                {"op": "create", "id": 3, "status": 201},
+                {"op": "update", "id": 1, "status": 204},
+                {"op": "delete", "id": 2, "status": 404},
+                {"op": "create", "id": 4, "status": 201},
+            ]
+        }
+
+    db = utils.TestingSessionLocal()
+    assert db.get(Todos, 1).completed
+    assert db.get(Todos, 2) is not None
+    assert db.get(Todos, 4).title == "second batch todo"
+    assert db.get(Todos, 4).owner_id == 1
+    db.close()
+
+
+async def test_batch_rejects_incomplete_operation():
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/api/todos/batch",
+            json={"operations": [{"op": "delete"}]},
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_batch_applies_operations_in_order(test_todo):
+    todo = {"title": "batch todo", "description": "desc", "priority": 2}
+    db = utils.TestingSessionLocal()
+    db.add(Todos(**todo, completed=False, owner_id=1))
+    db.commit()
+    db.close()
+
+    operations = [
+        {"op": "delete", "id": 1},
+        {"op": "update", "id": 1, "todo": {**todo, "completed": True}},
+        {"op": "delete", "id": 1},
+        {"op": "update", "id": 2, "todo": {**todo, "completed": True}},
+        {"op": "delete", "id": 2},
+    ]
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/api/todos/batch", json={"operations": operations}
+        )
+    assert [result["status"] for result in response.json()["results"]] == [
+        204,
+        404,
+        404,
+        204,
+        204,
+    ]
+
+    db = utils.TestingSessionLocal()
+    assert db.get(Todos, 1) is None
+    assert db.get(Todos, 2) is None
+    db.close()
+
+
+async def test_batch_creates_without_ordered_returning(monkeypatch, test_todo):
+    # MySQL can't return ids from an executemany INSERT in parameter order
+    monkeypatch.setattr(
+        utils.async_engine.dialect,
+        "insert_executemany_returning_sort_by_parameter_order",
+        False,
+    )
+    todo = {"title": "batch todo", "description": "desc", "priority": 2}
+    operations = [
+        {"op": "create", "todo": {**todo, "title": title}}
+        for title in ("first", "second")
+    ]
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/api/todos/batch", json={"operations": operations}
+        )
+    assert response.json() == {
+        "results": [
+            {"op": "create", "id": 2, "status": 201},
+            {"op": "create", "id": 3, "status": 201},
+        ]
+    }
+
+    db = utils.TestingSessionLocal()
+    assert [db.get(Todos, 2).title, db.get(Todos, 3).title] == ["first", "second"]
+    db.close()
@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from fastapi import status
+from httpx import AsyncClient
+
+from ..apis.auth import get_current_user
+from ..cache import OwnerCache, todo_lists
+from ..database import get_db
+from ..etags import bump_todo_version
+from ..main import app
+from ..models import Todos
+from ..pagination import MAX_PAGE_SIZE
+from ..routers.auth import create_access_token
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+
+
+def test_owner_cache_lru_eviction():
+    cache = OwnerCache(maxsize=2, ttl=60)
+    cache.set(1, "page", ["a"])
+    cache.set(2, "page", ["b"])
+    assert cache.get(1, "page") == ["a"]
+
+    cache.set(3, "page", ["c"])
+
+    assert cache.get(2, "page") is None
+    assert cache.get(1, "page") == ["a"]
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_owner_cache_caps_variants_per_owner():
+    cache = OwnerCache(maxsize=2, ttl=60, max_variants=2)
+    cache.set(1, "page 1", ["a"])
+    cache.set(1, "page 2", ["b"])
+    assert cache.get(1, "page 1") == ["a"]
+
+    cache.set(1, "page 3", ["c"])
+
+    assert cache.get(1, "page 2") is None
+    assert cache.get(1, "page 1") == ["a"]
+    assert cache.get(1, "page 3") == ["c"]
+    assert cache.metrics()["evictions"] == 1
+
+
+def test_owner_cache_ttl_expiry():
+    cache = OwnerCache(maxsize=2, ttl=-1)
+    cache.set(1, "page", ["a"])
+
+    assert cache.get(1, "page") is None
+    assert cache.metrics()["misses"] == 1
+
+
+async def test_write_invalidates_cached_list(test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get("http://127.0.0.1:8000/api/todos/")
+        assert len(response.json()["items"]) == 1
+        response = await client.get("http://127.0.0.1:8000/api/todos/")
+        assert len(response.json()["items"]) == 1
+        assert todo_lists.metrics()["hits"] == 1
+
+        response = await client.post(
+            "http://127.0.0.1:8000/api/todos/",
+            json={
+                "title": "New Todo",
+                "description": "some description",
+                "priority": 5,
+                "completed": False,
+            },
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = await client.get("http://127.0.0.1:8000/api/todos/")
+        assert len(response.json()["items"]) == 2
+
+
+async def test_page_size_is_capped():
+    misses = todo_lists.metrics()["misses"]
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/", params={"limit": MAX_PAGE_SIZE + 1}
+        )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert todo_lists.metrics()["misses"] == misses
+
+
+async def test_html_list_follows_writes_made_on_another_worker(test_todo):
+    token = create_access_token("testuser", 1, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        response = await client.get("http://127.0.0.1:8000/todos/")
+        assert "learn to code" in response.text
+
+        # a write that bumps the version but leaves this worker's cache alone
+        async with utils.AsyncTestingSessionLocal() as db:
+            db.add(Todos(title="written elsewhere", priority=1, owner_id=1))
+            await bump_todo_version(db, 1)
+            await db.commit()
+
+        response = await client.get("http://127.0.0.1:8000/todos/")
+        assert "written elsewhere" in response.text
@@ -0,0 +1,81 @@
+from fastapi import status
+from httpx import AsyncClient
+
+from .. import etags
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+
+NEW_TODO = {
+    "title": "New Todo",
+    "description": "some description",
+    "priority": 5,
+    "completed": False,
+}
+
+
+def test_matches_if_none_match_lists():
+    assert etags.matches('"a", W/"b"', '"b"')
+    assert etags.matches("*", '"b"')
+    assert not etags.matches('"a"', '"b"')
+    assert not etags.matches(None, '"b"')
+
+
+async def test_list_is_not_modified_until_a_write(test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get("http://127.0.0.1:8000/api/todos/")
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers["etag"] == etag
+        assert response.content == b""
+
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/",
+            params={"limit": 1},
+            headers={"If-None-Match": etag},
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+
+        response = await client.post("http://127.0.0.1:8000/api/todos/", json=NEW_TODO)
+        assert response.status_code == status.HTTP_201_CREATED
+
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["etag"] != etag
+        assert len(response.json()["items"]) == 2
+
+
+async def test_todo_is_not_modified_until_a_write(test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get("http://127.0.0.1:8000/api/todos/1/")
+        assert response.status_code == status.HTTP_200_OK
+        etag = response.headers["etag"]
+
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/1/", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        response = await client.post(
+            "http://127.0.0.1:8000/api/todos/batch",
+            json={"operations": [{"op": "update", "id": 1, "todo": NEW_TODO}]},
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/1/", headers={"If-None-Match": etag}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["title"] == "New Todo"
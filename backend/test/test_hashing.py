@@ -0,0 +1,111 @@
+import pytest
+from fastapi import HTTPException, status
+from httpx import AsyncClient
+from passlib.hash import bcrypt
+
+from .. import config, hashing, metrics
+from ..database import get_db
+from ..main import app
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+
+
+async def test_hash_and_verify_password():
+    hashed = await hashing.hash_password("testpass")
+
+    assert await hashing.verify_password("testpass", hashed)
+    assert not await hashing.verify_password("wrongpass", hashed)
+
+    metrics = hashing.pool.metrics()
+    assert metrics["hash"]["count"] >= 1
+    assert metrics["verify"]["count"] >= 2
+    assert metrics["in_flight"] == 0
+
+
+async def test_saturated_pool_rejects_with_503():
+    pool = hashing.HashingPool(max_workers=1, queue_limit=0)
+    pool.in_flight = 1
+
+    with pytest.raises(HTTPException) as e:
+        await pool.run("hash", hashing._hash, "testpass")
+    assert e.value.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert pool.metrics()["hash"]["rejected"] == 1
+
+
+async def test_hashes_of_a_lower_cost_are_updated():
+    stale = bcrypt.using(rounds=4).hash("testpass")
+    current = hashing.crypt_context().hash("testpass")
+
+    assert hashing.crypt_context().needs_update(stale)
+    assert not hashing.crypt_context().needs_update(current)
+    assert await hashing.verify_and_update("testpass", current) == (True, None)
+    assert await hashing.verify_and_update("wrongpass", stale) == (False, None)
+
+    verified, new_hash = await hashing.verify_and_update("testpass", stale)
+    assert verified
+    assert bcrypt.from_string(new_hash).rounds == config.BCRYPT_ROUNDS
+
+
+def test_hashes_of_a_higher_cost_are_kept(monkeypatch):
+    stronger = bcrypt.using(rounds=12).hash("testpass")
+    monkeypatch.setattr(config, "BCRYPT_ROUNDS", 10)
+    hashing.crypt_context.cache_clear()
+    try:
+        assert not hashing.crypt_context().needs_update(stronger)
+        assert hashing.crypt_context().verify("testpass", stronger)
+    finally:
+        monkeypatch.undo()
+        hashing.crypt_context.cache_clear()
+
+
+async def test_login_rehashes_a_stale_password(test_user):
+    with utils.engine.connect() as connection:
+        connection.execute(
+            utils.text("UPDATE users SET hashed_password = :hashed"),
+            {"hashed": bcrypt.using(rounds=4).hash("testpass")},
+        )
+        connection.commit()
+    rehashed = metrics.password_rehashed.values.get((), 0)
+
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/api/auth/token/",
+            data={"username": "testuser", "password": "testpass"},
+        )
+    assert response.status_code == status.HTTP_200_OK
+
+    with utils.engine.connect() as connection:
+        stored = connection.execute(
+            utils.text("SELECT hashed_password FROM users")
+        ).scalar_one()
+        connection.execute(utils.text("DELETE FROM refresh_tokens WHERE 1=1;"))
+        connection.commit()
+    assert bcrypt.from_string(stored).rounds == config.BCRYPT_ROUNDS
+    assert bcrypt.verify("testpass", stored)
+    assert metrics.password_rehashed.values[()] == rehashed + 1
+
+
+def test_calibrate_picks_the_most_rounds_within_the_target(monkeypatch):
+    monkeypatch.setattr(
+        hashing, "time_rounds", lambda rounds: 0.05 * 2 ** (rounds - 10)
+    )
+
+    assert hashing.calibrate(0.25) == (12, {10: 0.05, 11: 0.1, 12: 0.2, 13: 0.4})
+    assert hashing.calibrate(0.01)[0] == hashing.MIN_ROUNDS
+
+
+def test_pool_is_sized_to_a_share_of_the_cores(monkeypatch):
+    monkeypatch.delenv("HASH_POOL_SIZE", raising=False)
+    monkeypatch.setattr(hashing.os, "cpu_count", lambda: 16)
+    monkeypatch.setattr(hashing.pool, "max_workers", 16)
+
+    hashing.share_cores(4)
+    assert hashing.pool.max_workers == 4
+    hashing.share_cores(32)
+    assert hashing.pool.max_workers == 1
+
+    monkeypatch.setenv("HASH_POOL_SIZE", "3")
+    hashing.pool.max_workers = 3
+    hashing.share_cores(4)
+    assert hashing.pool.max_workers == 3
@@ -0,0 +1,52 @@
+from fastapi import status
+from httpx import AsyncClient
+
+from .. import metrics
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+metrics.instrument_engine(utils.async_engine.sync_engine)
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "Test.", ("route",), (0.1, 1.0))
+    histogram.observe(("/a/",), 0.05)
+    histogram.observe(("/a/",), 0.5)
+    histogram.observe(("/a/",), 5)
+    metrics.registry.remove(histogram)
+
+    assert list(histogram.samples()) == [
+        ("test_seconds_bucket", '{route="/a/",le="0.1"}', 1),
+        ("test_seconds_bucket", '{route="/a/",le="1.0"}', 2),
+        ("test_seconds_bucket", '{route="/a/",le="+Inf"}', 3),
+        ("test_seconds_sum", '{route="/a/"}', 5.55),
+        ("test_seconds_count", '{route="/a/"}', 3),
+    ]
+
+
+async def test_metrics_endpoint_reports_requests_and_queries(test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get("http://127.0.0.1:8000/api/todos/1/")
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await client.get("http://127.0.0.1:8000/metrics")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"].startswith("text/plain")
+
+    body = response.text
+    assert (
+        'http_requests_total{method="GET",route="/api/todos/{todo_id}/",status="200"}'
+        in body
+    )
+    assert (
+        'http_request_duration_seconds_count{method="GET",route="/api/todos/{todo_id}/"}'
+        in body
+    )
+    assert 'db_queries_total{route="/api/todos/{todo_id}/"}' in body
+    assert "http_requests_in_flight" in body
+    assert "# TYPE password_hash_duration_seconds histogram" in body
+    assert 'todo_list_cache_requests_total{result="hit"}' in body
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+
+from .. import startup
+from ..models import Base
+from .utils import engine
+
+
+def test_migrations_match_the_models():
+    # the test database is built by the migrations, not create_all
+    def include_object(obj, name, type_, reflected, compare_to):
+        # the FTS5 table and its shadow tables are created by raw DDL
+        return not (type_ == "table" and name.startswith("todos_fts"))
+
+    with engine.connect() as connection:
+        context = MigrationContext.configure(
+            connection, opts={"include_object": include_object}
+        )
+        assert compare_metadata(context, Base.metadata) == []
+
+
+def test_app_import_defers_heavy_packages():
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    loaded = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, backend.main; "
+            "print(sorted({'jose', 'passlib', 'jinja2', 'alembic'} & set(sys.modules)))",
+        ],
+        cwd=root,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert loaded.stdout.strip() == "[]"
+
+
+def test_import_times_are_summed_by_package():
+    stderr = "\n".join(
+        [
+            "import time: self [us] | cumulative | imported package",
+            "import time:       150 |        150 |     sqlalchemy.util",
+            "import time:       250 |        400 |   sqlalchemy",
+            "import time:      1000 |       1000 | backend.main",
+            "some other output",
+        ]
+    )
+    assert startup.import_times(stderr) == {
+        "sqlalchemy": pytest.approx(0.0004),
+        "backend": pytest.approx(0.001),
+    }
+
+
+def test_startup_phases_are_recorded():
+    startup.mark("test")
+    assert startup.phases["test"] >= 0
+    assert {"imports", "app"} <= startup.phases.keys()
+    del startup.phases["test"]
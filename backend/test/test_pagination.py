@@ -0,0 +1,237 @@
+import csv
+import io
+import json
+from datetime import timedelta
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from ..models import Todos
+from ..pagination import MAX_PAGE_SIZE, encode_cursor
+from ..routers.auth import create_access_token
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+
+
+@pytest.fixture
+def test_todos():
+    db = utils.TestingSessionLocal()
+    db.add_all(
+        Todos(title=f"todo {i}", description="desc", priority=1, owner_id=1)
+        for i in range(5)
+    )
+    db.add(Todos(title="someone else's", description="desc", priority=1, owner_id=2))
+    db.commit()
+    db.close()
+    yield
+
+    with utils.engine.connect() as connection:
+        connection.execute(utils.text("DELETE FROM todos WHERE 1=1;"))
+        connection.commit()
+
+
+async def test_read_all_pages_with_cursor(test_todos):
+    titles = []
+    cursor = None
+    async with AsyncClient(transport=utils.transport) as client:
+        while True:
+            params = {"limit": 2} if cursor is None else {"limit": 2, "cursor": cursor}
+            response = await client.get(
+                "http://127.0.0.1:8000/api/todos/", params=params
+            )
+            assert response.status_code == status.HTTP_200_OK
+            page = response.json()
+            assert len(page["items"]) <= 2
+            titles += [item["title"] for item in page["items"]]
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    assert titles == [f"todo {i}" for i in range(5)]
+
+
+async def test_html_list_renders_one_page_with_more_rows(test_todos):
+    token = create_access_token("testuser", 1, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        response = await client.get("http://127.0.0.1:8000/todos/", params={"limit": 2})
+        assert response.status_code == status.HTTP_200_OK
+        assert "todo 1" in response.text
+        assert "todo 2" not in response.text
+        assert 'id="load-more"' in response.text
+
+        rows_url = response.text.split('data-rows="')[1].split('"')[0]
+        response = await client.get(f"http://127.0.0.1:8000{rows_url}")
+        assert response.status_code == status.HTTP_200_OK
+        assert "<html" not in response.text
+        assert "todo 2" in response.text
+        assert "todo 3" in response.text
+        assert "todo 4" not in response.text
+        assert '<td class="py-2 px-4">4</td>' in response.text
+
+
+async def test_admin_read_all_pages_whole_table(test_todos):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/api/admin/todo/", params={"limit": 10}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        page = response.json()
+        assert len(page["items"]) == 6
+        assert page["next_cursor"] is None
+
+        response = await client.get(
+            "http://127.0.0.1:8000/api/admin/todo/",
+            params={"limit": MAX_PAGE_SIZE + 1},
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_invalid_cursor():
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/", params={"cursor": "not-a-cursor"}
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": "Invalid cursor."}
+
+
+@pytest.mark.parametrize(
+    "values, params",
+    [
+        (["1"], {}),
+        ([True], {}),
+        ([1.5], {}),
+        ([None], {}),
+        ([{"id": 1}], {}),
+        (["high", 1], {"order_by": "priority"}),
+        ([3, "1"], {"order_by": "priority"}),
+    ],
+)
+async def test_cursor_of_the_wrong_type(values, params):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/",
+            params={**params, "cursor": encode_cursor(values)},
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": "Invalid cursor."}
+
+
+async def test_admin_export_ndjson(test_todos):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/api/admin/todo/", params={"format": "ndjson"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["content-type"] == "application/x-ndjson"
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["id"] for row in rows] == [1, 2, 3, 4, 5, 6]
+        assert rows[0]["title"] == "todo 0"
+
+
+async def test_admin_export_csv(test_todos):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/api/admin/todo/", params={"format": "csv"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == [
+            "id",
+            "title",
+            "description",
+            "priority",
+            "completed",
+            "owner_id",
+        ]
+        assert len(rows) == 7
+
+
+@pytest.fixture
+def prioritized_todos():
+    db = utils.TestingSessionLocal()
+    db.add_all(
+        Todos(
+            title=f"todo {i}",
+            description="desc",
+            priority=i % 5 + 1,
+            completed=i % 3 == 0,
+            owner_id=1,
+        )
+        for i in range(10)
+    )
+    db.commit()
+    db.close()
+    yield
+
+    with utils.engine.connect() as connection:
+        connection.execute(utils.text("DELETE FROM todos WHERE 1=1;"))
+        connection.commit()
+
+
+async def test_read_all_filters_and_orders_in_sql(prioritized_todos):
+    params = {
+        "completed": "false",
+        "priority_min": 2,
+        "priority_max": 4,
+        "order_by": "priority",
+        "direction": "desc",
+        "limit": 2,
+    }
+    items = []
+    async with AsyncClient(transport=utils.transport) as client:
+        while True:
+            response = await client.get(
+                "http://127.0.0.1:8000/api/todos/", params=params
+            )
+            assert response.status_code == status.HTTP_200_OK
+            page = response.json()
+            items += [(item["priority"], item["title"]) for item in page["items"]]
+            if page["next_cursor"] is None:
+                break
+            params["cursor"] = page["next_cursor"]
+
+    # todos 0, 3, 6 and 9 are completed; priority is i % 5 + 1
+    assert items == [(4, "todo 8"), (3, "todo 7"), (3, "todo 2"), (2, "todo 1")]
+
+
+async def test_read_all_rejects_bad_filters():
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/", params={"priority_min": 9}
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = await client.get(
+            "http://127.0.0.1:8000/api/todos/", params={"order_by": "title"}
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_html_list_filters_keep_across_pages(prioritized_todos):
+    token = create_access_token("testuser", 1, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        # untouched form fields arrive empty
+        response = await client.get(
+            "http://127.0.0.1:8000/todos/?completed=true&priority_min=&priority_max="
+            "&order_by=id&direction=asc&limit=2"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert "todo 0" in response.text and "todo 3" in response.text
+        assert "todo 1" not in response.text
+
+        rows_url = response.text.split('data-rows="')[1].split('"')[0]
+        assert "completed=true" in rows_url
+        response = await client.get(f"http://127.0.0.1:8000{rows_url}")
+        assert "todo 6" in response.text and "todo 9" in response.text
+        assert 'id="load-more"' not in response.text
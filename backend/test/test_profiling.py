@@ -0,0 +1,64 @@
+import logging
+
+from fastapi import status
+from httpx import AsyncClient
+
+from .. import config, profiling
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+profiling.instrument_engine(utils.async_engine.sync_engine)
+
+
+def test_normalize_sql_collapses_literals_and_in_lists():
+    statement = """
+        SELECT todos.id FROM todos
+        WHERE todos.owner_id = ? AND todos.title = 'it''s' AND todos.id IN (?, ?, ?)
+        LIMIT 10
+    """
+    assert profiling.normalize_sql(statement) == (
+        "SELECT todos.id FROM todos WHERE todos.owner_id = ? AND todos.title = ? "
+        "AND todos.id IN (?, ...) LIMIT ?"
+    )
+    assert profiling.normalize_sql("SELECT * FROM users WHERE id = %(id_1)s") == (
+        "SELECT * FROM users WHERE id = ?"
+    )
+
+
+def test_report_flags_repeated_statements(monkeypatch, caplog):
+    monkeypatch.setattr(config, "SQL_SLOW_REQUEST_MS", 50)
+    monkeypatch.setattr(config, "SQL_REPEAT_THRESHOLD", 3)
+    profile = profiling.QueryProfile()
+    profile.record("SELECT users.id FROM users", 0.001)
+    for _ in range(3):
+        profile.record("SELECT todos.id FROM todos WHERE todos.owner_id = ?", 0.03)
+
+    with caplog.at_level(logging.WARNING, logger=profiling.__name__):
+        profiling.report({"method": "GET", "path": "/todos/"}, profile)
+
+    assert len(caplog.records) == 2
+    assert "slow SQL in GET /todos/: 4 statements, 91.0 ms total" in caplog.text
+    assert (
+        "possible N+1 in GET /todos/: statement ran 3 times: "
+        "SELECT todos.id FROM todos WHERE todos.owner_id = ?" in caplog.text
+    )
+
+
+async def test_server_timing_header_only_when_debugging(monkeypatch, test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get("http://127.0.0.1:8000/api/todos/1/")
+        assert response.status_code == status.HTTP_200_OK
+        assert "server-timing" not in response.headers
+
+        monkeypatch.setattr(config, "DEBUG", True)
+        response = await client.get("http://127.0.0.1:8000/api/todos/1/")
+        assert response.status_code == status.HTTP_200_OK
+
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert 'desc="2 queries"' in timing
+    assert "db-slowest;dur=" in timing
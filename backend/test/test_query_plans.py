@@ -0,0 +1,50 @@
+import re
+
+import pytest
+from sqlalchemy import select, tuple_
+
+from ..models import Todos
+from ..search import search_statement
+from . import utils
+
+# the per-user queries issued by the todo list, read, update and delete paths
+HOT_QUERIES = {
+    "list page": select(Todos).where(Todos.owner_id == 1).order_by(Todos.id).limit(51),
+    "list next page": select(Todos)
+    .where(Todos.owner_id == 1, tuple_(Todos.id) > tuple_(10))
+    .order_by(Todos.id)
+    .limit(51),
+    "list all": select(Todos).where(Todos.owner_id == 1),
+    "read one": select(Todos).where(Todos.id == 1, Todos.owner_id == 1),
+    "filter by status": select(Todos)
+    .where(Todos.owner_id == 1, Todos.completed.is_(False))
+    .order_by(Todos.priority),
+    "by priority, next page": select(Todos)
+    .where(
+        Todos.owner_id == 1,
+        Todos.priority <= 4,
+        tuple_(Todos.priority, Todos.id) < tuple_(3, 10),
+    )
+    .order_by(Todos.priority.desc(), Todos.id.desc())
+    .limit(51),
+    "open by id": select(Todos)
+    .where(Todos.owner_id == 1, Todos.completed.is_(False))
+    .order_by(Todos.id)
+    .limit(51),
+    "search": search_statement("sqlite", 1, "buy milk").limit(50),
+}
+
+
+def query_plan(stmt) -> list[str]:
+    compiled = stmt.compile(utils.engine, compile_kwargs={"literal_binds": True})
+    with utils.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")
+        return [row[-1] for row in rows]
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_query_uses_index(name):
+    plan = query_plan(HOT_QUERIES[name])
+
+    scans = [step for step in plan if re.match(r"SCAN (TABLE )?todos( |$)", step)]
+    assert not scans, f"{name!r} scans the todos table: {plan}"
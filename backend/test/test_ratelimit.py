@@ -0,0 +1,101 @@
+from fastapi import status
+from httpx import AsyncClient
+
+from .. import hashing, ratelimit
+from ..database import get_db
+from ..main import app
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+
+
+async def test_bucket_allows_a_burst_then_refills(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now)
+    limiter = ratelimit.RateLimiter("test", burst=2, per_minute=6, maxsize=10)
+
+    assert await limiter.take("a") == 0
+    assert await limiter.take("a") == 0
+    assert await limiter.take("a") == 10.0
+    assert await limiter.take("b") == 0
+
+    now += 10
+    assert await limiter.take("a") == 0
+    assert await limiter.take("a") > 0
+
+
+async def test_buckets_are_bounded_and_idle_ones_dropped(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now)
+    limiter = ratelimit.RateLimiter("test", burst=2, per_minute=60, maxsize=2)
+
+    for key in ("a", "b", "c"):
+        await limiter.take(key)
+    assert limiter.metrics() == {"size": 2, "maxsize": 2, "evictions": 1}
+
+    now += limiter.idle_seconds
+    await limiter.take("d")
+    assert limiter.metrics() == {"size": 1, "maxsize": 2, "evictions": 3}
+
+
+async def test_sqlite_buckets_are_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "limits.sqlite")
+    first = ratelimit.SQLiteRateLimiter("login_ip", 2, 1, path)
+    second = ratelimit.SQLiteRateLimiter("login_ip", 2, 1, path)
+    other = ratelimit.SQLiteRateLimiter("login_username", 2, 1, path)
+
+    assert await first.take("10.0.0.1") == 0
+    assert await second.take("10.0.0.1") == 0
+    assert await first.take("10.0.0.1") > 0
+    assert await other.take("10.0.0.1") == 0
+
+    second.clear()
+    assert await first.take("10.0.0.1") == 0
+
+
+async def test_login_is_rejected_before_hashing(monkeypatch):
+    monkeypatch.setattr(
+        ratelimit, "login_by_ip", ratelimit.RateLimiter("login_ip", 2, 1, 10)
+    )
+    form = {"username": "nobody", "password": "wrongpass"}
+    async with AsyncClient(transport=utils.transport) as client:
+        for _ in range(2):
+            response = await client.post(
+                "http://127.0.0.1:8000/api/auth/token/", data=form
+            )
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        verified = hashing.pool.metrics()["verify"]["count"]
+        response = await client.post("http://127.0.0.1:8000/api/auth/token/", data=form)
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert int(response.headers["retry-after"]) > 0
+        assert hashing.pool.metrics()["verify"]["count"] == verified
+
+        response = await client.post(
+            "http://127.0.0.1:8000/auth/",
+            data={"email": "nobody", "password": "wrongpass"},
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+        assert "Too many login attempts" in response.text
+
+
+async def test_username_budget_is_shared_across_clients(monkeypatch):
+    monkeypatch.setattr(
+        ratelimit,
+        "login_by_username",
+        ratelimit.RateLimiter("login_username", 1, 1, 10),
+    )
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/api/auth/token/",
+            data={"username": "Victim", "password": "wrongpass"},
+        )
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    other = type(utils.transport)(app=app, client=("10.0.0.2", 123))
+    async with AsyncClient(transport=other) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/api/auth/token/",
+            data={"username": "victim", "password": "wrongpass"},
+        )
+        assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
@@ -0,0 +1,75 @@
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from ..models import Todos
+from ..search import fts5_query
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+
+
+@pytest.fixture
+def searchable_todos():
+    db = utils.TestingSessionLocal()
+    db.add_all(
+        [
+            Todos(title="buy milk", description="from the corner store", owner_id=1),
+            Todos(title="call mum", description="about the milkshake", owner_id=1),
+            Todos(title="file taxes", description="before april", owner_id=1),
+            Todos(title="buy milk", description="someone else's", owner_id=2),
+        ]
+    )
+    db.commit()
+    db.close()
+    yield
+
+    with utils.engine.connect() as connection:
+        connection.execute(utils.text("DELETE FROM todos WHERE 1=1;"))
+        connection.commit()
+
+
+def test_fts5_query_quotes_user_input():
+    assert fts5_query('milk "OR owner_id', 1) == (
+        'owner_id : "1" AND {title description} : ("milk" AND "OR" AND "owner_id"*)'
+    )
+    assert fts5_query("***", 1) is None
+
+
+async def search(client, q):
+    response = await client.get(
+        "http://127.0.0.1:8000/api/todos/search", params={"q": q}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return [(todo["title"], todo["owner_id"]) for todo in response.json()["items"]]
+
+
+async def test_search_ranks_own_matches(searchable_todos):
+    async with AsyncClient(transport=utils.transport) as client:
+        # the last word matches as a prefix, title hits rank first
+        assert await search(client, "mil") == [("buy milk", 1), ("call mum", 1)]
+        assert await search(client, "corner milk") == [("buy milk", 1)]
+        assert await search(client, "april taxes") == [("file taxes", 1)]
+        assert await search(client, "?!") == []
+
+
+async def test_search_follows_writes(searchable_todos):
+    async with AsyncClient(transport=utils.transport) as client:
+        todo_id = (
+            await client.get("http://127.0.0.1:8000/api/todos/search?q=taxes")
+        ).json()["items"][0]["id"]
+
+        response = await client.patch(
+            f"http://127.0.0.1:8000/api/todos/{todo_id}/", json={"title": "pay rent"}
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert await search(client, "taxes") == []
+        assert await search(client, "rent") == [("pay rent", 1)]
+
+        response = await client.delete(f"http://127.0.0.1:8000/api/todos/{todo_id}/")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert await search(client, "rent") == []
@@ -0,0 +1,242 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from jose import JWTError
+
+from .. import config, sessions, tokens
+from ..apis import auth as auth_api
+from ..database import get_db
+from ..main import app
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+
+
+@pytest.fixture(autouse=True)
+def clear_refresh_tokens():
+    yield
+
+    tokens.revoked_sessions.clear()
+    with utils.engine.connect() as connection:
+        connection.execute(utils.text("DELETE FROM refresh_tokens WHERE 1=1;"))
+        connection.commit()
+
+
+async def login(client: AsyncClient) -> dict:
+    response = await client.post(
+        "http://127.0.0.1:8000/api/auth/token/",
+        data={"username": "testuser", "password": "testpass"},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+async def refresh(client: AsyncClient, refresh_token: str):
+    return await client.post(
+        "http://127.0.0.1:8000/api/auth/refresh",
+        json={"refresh_token": refresh_token},
+    )
+
+
+def test_refresh_tokens_are_stored_as_digests():
+    assert sessions.hash_token("abc") == (
+        "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
+    )
+
+
+async def test_refresh_rotates_tokens(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        first = await login(client)
+        assert tokens.decode_token(first["access_token"])["sid"]
+
+        response = await refresh(client, first["refresh_token"])
+        assert response.status_code == status.HTTP_200_OK
+        second = response.json()
+        assert second["refresh_token"] != first["refresh_token"]
+        assert tokens.decode_token(second["access_token"])["id"] == test_user.id
+
+        response = await refresh(client, second["refresh_token"])
+        assert response.status_code == status.HTTP_200_OK
+
+        response = await refresh(client, "not-a-token")
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+async def test_reused_refresh_token_revokes_the_family(monkeypatch, test_user):
+    monkeypatch.setattr(config, "REFRESH_REUSE_GRACE_SECONDS", 0)
+    async with AsyncClient(transport=utils.transport) as client:
+        first = await login(client)
+        second = (await refresh(client, first["refresh_token"])).json()
+        other_login = await login(client)
+
+        response = await refresh(client, first["refresh_token"])
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = await refresh(client, second["refresh_token"])
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        with pytest.raises(JWTError):
+            tokens.decode_token(second["access_token"])
+
+        response = await refresh(client, other_login["refresh_token"])
+        assert response.status_code == status.HTTP_200_OK
+
+
+async def test_reuse_within_grace_is_not_theft(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        first = await login(client)
+        second = (await refresh(client, first["refresh_token"])).json()
+
+        response = await refresh(client, first["refresh_token"])
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = await refresh(client, second["refresh_token"])
+        assert response.status_code == status.HTTP_200_OK
+
+
+async def test_html_session_is_renewed_from_the_refresh_cookie(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/auth/",
+            data={"email": "testuser", "password": "testpass"},
+        )
+        assert response.status_code == status.HTTP_302_FOUND
+        refresh_token = response.cookies[sessions.REFRESH_COOKIE]
+
+    # the access cookie has expired and the browser dropped it
+    async with AsyncClient(
+        transport=utils.transport,
+        cookies={sessions.REFRESH_COOKIE: refresh_token},
+    ) as client:
+        response = await client.get("http://127.0.0.1:8000/todos/")
+        assert response.status_code == status.HTTP_200_OK
+        assert tokens.decode_token(response.cookies["access_token"])["id"] == (
+            test_user.id
+        )
+        assert response.cookies[sessions.REFRESH_COOKIE] != refresh_token
+
+        # the next request carries a fresh access cookie and isn't renewed again
+        response = await client.get("http://127.0.0.1:8000/todos/")
+        assert response.status_code == status.HTTP_200_OK
+        assert "set-cookie" not in response.headers
+
+        response = await client.get("http://127.0.0.1:8000/auth/logout/")
+        assert response.status_code == status.HTTP_302_FOUND
+
+    async with AsyncClient(
+        transport=utils.transport,
+        cookies={sessions.REFRESH_COOKIE: refresh_token},
+    ) as client:
+        response = await client.get("http://127.0.0.1:8000/todos/")
+        assert response.status_code == status.HTTP_302_FOUND
+        assert 'refresh_token=""' in response.headers["set-cookie"]
+
+
+async def test_password_change_revokes_the_other_sessions(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        stolen = await login(client)
+        caller = await login(client)
+
+        response = await client.post(
+            "http://127.0.0.1:8000/api/users/change-pass/",
+            json={"password": "testpass", "new_password": "newpass"},
+            headers={"Authorization": f"Bearer {caller['access_token']}"},
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        renewed = response.json()
+
+        for old in (stolen, caller):
+            response = await refresh(client, old["refresh_token"])
+            assert response.status_code == status.HTTP_401_UNAUTHORIZED
+            with pytest.raises(JWTError):
+                tokens.decode_token(old["access_token"])
+
+        assert tokens.decode_token(renewed["access_token"])["id"] == test_user.id
+        response = await refresh(client, renewed["refresh_token"])
+        assert response.status_code == status.HTTP_200_OK
+
+
+async def test_html_password_change_starts_a_new_session(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.post(
+            "http://127.0.0.1:8000/auth/",
+            data={"email": "testuser", "password": "testpass"},
+        )
+        old_refresh_token = response.cookies[sessions.REFRESH_COOKIE]
+        old_access_token = response.cookies["access_token"]
+
+        response = await client.post(
+            "http://127.0.0.1:8000/auth/change-password/",
+            data={
+                "current_password": "testpass",
+                "new_password": "newpass",
+                "confirm_password": "newpass",
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert "Password changed successfully" in response.text
+        assert response.cookies[sessions.REFRESH_COOKIE] != old_refresh_token
+
+        with pytest.raises(JWTError):
+            tokens.decode_token(old_access_token)
+        response = await refresh(client, old_refresh_token)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+        response = await client.get("http://127.0.0.1:8000/todos/")
+        assert response.status_code == status.HTTP_200_OK
+
+
+async def test_api_access_tokens_expire(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        session = await login(client)
+    payload = tokens.decode_token(session["access_token"])
+    assert payload["exp"] - time.time() <= config.API_ACCESS_TOKEN_MINUTES * 60
+    # revocations are kept at least as long as an API token lives
+    assert tokens.revoked_sessions.ttl >= config.API_ACCESS_TOKEN_MINUTES * 60
+
+    expired = auth_api.create_access_token(
+        "testuser", test_user.id, "admin", timedelta(seconds=-1), session_id="f"
+    )
+    with pytest.raises(JWTError):
+        tokens.decode_token(expired)
+
+
+def test_session_tokens_without_an_expiry_are_rejected():
+    token = tokens.encode_token({"sub": "testuser", "id": 1, "sid": "family"})
+    with pytest.raises(JWTError):
+        tokens.decode_token(token)
+
+
+async def test_unusable_refresh_tokens_are_pruned(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        first = await login(client)
+        second = (await refresh(client, first["refresh_token"])).json()
+        revoked = await login(client)
+        await client.post(
+            "http://127.0.0.1:8000/api/auth/refresh",
+            json={"refresh_token": revoked["refresh_token"]},
+        )
+    with utils.engine.connect() as connection:
+        connection.execute(
+            utils.text("UPDATE refresh_tokens SET revoked = 1 WHERE family = :f"),
+            {"f": tokens.decode_token(revoked["access_token"])["sid"]},
+        )
+        connection.execute(
+            utils.text(
+                "UPDATE refresh_tokens SET expires_at = 0 WHERE token_hash = :h"
+            ),
+            {"h": sessions.hash_token(first["refresh_token"])},
+        )
+        connection.commit()
+
+    async for db in utils.override_get_db():
+        assert await sessions.prune(db) == 3
+        await db.commit()
+
+    with utils.engine.connect() as connection:
+        remaining = connection.execute(
+            utils.text("SELECT token_hash FROM refresh_tokens")
+        ).scalars()
+        assert list(remaining) == [sessions.hash_token(second["refresh_token"])]
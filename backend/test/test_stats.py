@@ -0,0 +1,230 @@
+from datetime import timedelta
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from .. import migrate, stats
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from ..routers import auth as routers_auth
+from ..routers.auth import create_access_token
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+app.dependency_overrides[routers_auth.get_current_user] = (
+    utils.override_get_current_user
+)
+
+
+def new_todo(priority: int, completed: bool = False) -> dict:
+    return {
+        "title": "a new task",
+        "description": "task description",
+        "priority": priority,
+        "completed": completed,
+    }
+
+
+def clear_tables():
+    with utils.engine.connect() as connection:
+        connection.execute(utils.text("DELETE FROM todos WHERE 1=1;"))
+        connection.execute(utils.text("DELETE FROM todo_stats WHERE 1=1;"))
+        connection.commit()
+
+
+@pytest.fixture(autouse=True)
+def empty_tables():
+    # other modules' fixtures delete todos without touching the counters
+    clear_tables()
+    yield
+    clear_tables()
+
+
+async def read_stats(client: AsyncClient) -> dict:
+    response = await client.get("http://127.0.0.1:8000/api/todos/stats")
+    assert response.status_code == status.HTTP_200_OK
+    return response.json()
+
+
+async def assert_in_step():
+    async with utils.AsyncTestingSessionLocal() as db:
+        assert await stats.drifted(db) == []
+
+
+async def test_stats_follow_api_writes():
+    async with AsyncClient(transport=utils.transport) as client:
+        assert await read_stats(client) == {
+            "total": 0,
+            "completed": 0,
+            "by_priority": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
+        }
+
+        for priority in (1, 2, 2):
+            response = await client.post(
+                "http://127.0.0.1:8000/api/todos/", json=new_todo(priority)
+            )
+            assert response.status_code == status.HTTP_201_CREATED
+        first, second, third = (
+            item["id"]
+            for item in (await client.get("http://127.0.0.1:8000/api/todos/")).json()[
+                "items"
+            ]
+        )
+
+        await client.put(
+            f"http://127.0.0.1:8000/api/todos/{first}/", json=new_todo(5, True)
+        )
+        await client.patch(
+            f"http://127.0.0.1:8000/api/todos/{second}/", json={"completed": True}
+        )
+        await client.patch(
+            f"http://127.0.0.1:8000/api/todos/{second}/", json={"title": "renamed"}
+        )
+        await client.delete(f"http://127.0.0.1:8000/api/todos/{third}/")
+
+        assert await read_stats(client) == {
+            "total": 2,
+            "completed": 2,
+            "by_priority": {"1": 0, "2": 1, "3": 0, "4": 0, "5": 1},
+        }
+
+        response = await client.post(
+            "http://127.0.0.1:8000/api/todos/batch",
+            json={
+                "operations": [
+                    {"op": "create", "todo": new_todo(3)},
+                    {"op": "update", "id": first, "todo": new_todo(4)},
+                    {"op": "update", "id": first, "todo": new_todo(3)},
+                    {"op": "delete", "id": second},
+                    {"op": "delete", "id": 999},
+                ]
+            },
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+        assert await read_stats(client) == {
+            "total": 2,
+            "completed": 0,
+            "by_priority": {"1": 0, "2": 0, "3": 2, "4": 0, "5": 0},
+        }
+    await assert_in_step()
+
+
+async def test_stats_follow_html_and_admin_writes():
+    token = create_access_token("testuser", 1, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        form = {"title": "a new task", "description": "task description"}
+        for priority in (1, 4):
+            await client.post(
+                "http://127.0.0.1:8000/todos/add-todo/",
+                data={**form, "priority": priority},
+            )
+        first, second = (
+            item["id"]
+            for item in (await client.get("http://127.0.0.1:8000/api/todos/")).json()[
+                "items"
+            ]
+        )
+
+        await client.get(f"http://127.0.0.1:8000/todos/complete/{first}/")
+        await client.post(
+            f"http://127.0.0.1:8000/todos/edit-todo/{first}/",
+            data={**form, "priority": 3},
+        )
+        await client.get(f"http://127.0.0.1:8000/todos/complete/{second}/")
+        await client.get(f"http://127.0.0.1:8000/todos/complete/{second}/")
+        await client.delete(f"http://127.0.0.1:8000/api/admin/todo/{second}/")
+
+        assert await read_stats(client) == {
+            "total": 1,
+            "completed": 1,
+            "by_priority": {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0},
+        }
+
+        response = await client.get("http://127.0.0.1:8000/api/admin/todo/stats/")
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "owners": 1,
+            "total": 1,
+            "completed": 1,
+            "by_priority": {"1": 0, "2": 0, "3": 1, "4": 0, "5": 0},
+        }
+    await assert_in_step()
+
+
+async def test_stats_follow_admin_html_deletes():
+    async with AsyncClient(transport=utils.transport) as client:
+        for priority in (2, 5):
+            await client.post(
+                "http://127.0.0.1:8000/api/todos/", json=new_todo(priority, True)
+            )
+        first, _ = (
+            item["id"]
+            for item in (await client.get("http://127.0.0.1:8000/api/todos/")).json()[
+                "items"
+            ]
+        )
+
+        response = await client.delete(f"http://127.0.0.1:8000/admin/todo/{first}/")
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+
+        assert await read_stats(client) == {
+            "total": 1,
+            "completed": 1,
+            "by_priority": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 1},
+        }
+    await assert_in_step()
+
+
+async def test_counted_locks_the_todo_before_reading_it(tmp_path):
+    # FOR UPDATE is a no-op on SQLite; the read has to take the write lock
+    url = f"sqlite:///{tmp_path / 'locks.db'}"
+    migrate.upgrade(url, configure_logger=False)
+    engine = create_async_engine(
+        url.replace("sqlite://", "sqlite+aiosqlite://"),
+        connect_args={"timeout": 0.1},
+    )
+    async with engine.begin() as connection:
+        await connection.execute(
+            utils.text(
+                "INSERT INTO todos (id, title, priority, completed, owner_id) "
+                "VALUES (1, 'a', 2, 0, 1)"
+            )
+        )
+    try:
+        async with AsyncSession(engine) as first, AsyncSession(engine) as second:
+            before = await stats.counted(first, 1, 1)
+            assert (before.completed, before.priority) == (False, 2)
+            with pytest.raises(exc.OperationalError, match="locked"):
+                await stats.counted(second, 1, 1)
+            assert await stats.counted(first, 2, 1) is None
+    finally:
+        await engine.dispose()
+
+
+async def test_rebuild_corrects_drift(test_todo):
+    # the fixture inserts straight into todos, bypassing the counters
+    async with utils.AsyncTestingSessionLocal() as db:
+        assert await stats.drifted(db) == [
+            {
+                "owner_id": 1,
+                "stored": dict.fromkeys(stats.COUNTS, 0),
+                "expected": {
+                    **dict.fromkeys(stats.COUNTS, 0),
+                    "total": 1,
+                    "priority_1": 1,
+                },
+            }
+        ]
+        await stats.rebuild(db)
+        assert await stats.drifted(db) == []
+
+    async with AsyncClient(transport=utils.transport) as client:
+        assert (await read_stats(client))["total"] == 1
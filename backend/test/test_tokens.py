@@ -0,0 +1,69 @@
+import time
+from datetime import timedelta
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient
+
+from .. import tokens
+from ..routers import auth
+from . import utils
+
+
+@pytest.fixture
+def decode_calls(monkeypatch):
+    calls = []
+
+    def counting_decode(token):
+        calls.append(token)
+        return tokens.decode_token(token)
+
+    monkeypatch.setattr(auth, "decode_token", counting_decode)
+    yield calls
+
+
+def test_decode_token_is_cached(monkeypatch):
+    tokens.verified_tokens.clear()
+    token = auth.create_access_token("testuser", 1, timedelta(minutes=5))
+    decoded = []
+    original = tokens.jwt.decode
+    monkeypatch.setattr(
+        tokens.jwt, "decode", lambda *a, **kw: decoded.append(1) or original(*a, **kw)
+    )
+
+    assert tokens.decode_token(token)["sub"] == "testuser"
+    assert tokens.decode_token(token)["sub"] == "testuser"
+    assert len(decoded) == 1
+
+
+def test_expired_tokens_are_evicted():
+    cache = tokens.VerifiedTokenCache(maxsize=2, max_ttl=60)
+    cache.set("expired", {"sub": "testuser", "exp": time.time() - 1})
+    cache.set("fresh", {"sub": "testuser", "exp": time.time() + 60})
+
+    assert cache.get("expired") is None
+    assert cache.get("fresh")["sub"] == "testuser"
+
+
+async def test_user_is_resolved_once_per_request(decode_calls):
+    token = auth.create_access_token("testuser", 1, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        response = await client.get("http://127.0.0.1:8000/todos/add-todo/")
+        assert response.status_code == status.HTTP_200_OK
+    assert len(decode_calls) == 1
+
+
+async def test_static_and_health_skip_auth(decode_calls):
+    token = auth.create_access_token("testuser", 1, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        response = await client.get(
+            "http://127.0.0.1:8000/static/generics/css/styles.css"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        response = await client.get("http://127.0.0.1:8000/healthy/")
+        assert response.status_code == status.HTTP_200_OK
+    assert decode_calls == []
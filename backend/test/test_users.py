@@ -1,14 +1,17 @@
 from fastapi import status
 from httpx import AsyncClient
 
+from ..apis import auth as auth_api
 from ..main import app
 from ..models import Users
-from ..routers.auth import bcrypt_context
-from ..routers.users import get_current_user, get_db
+from ..hashing import crypt_context
+from ..database import get_db
+from ..routers.users import get_current_user
 from . import utils
 
 app.dependency_overrides[get_db] = utils.override_get_db
 app.dependency_overrides[get_current_user] = utils.override_get_current_user
+app.dependency_overrides[auth_api.get_current_user] = utils.override_get_current_user
 
 
 async def test_return_user(test_user):
@@ -18,12 +21,26 @@ async def test_return_user(test_user):
         res = response.json()
         assert res["id"] == 1
         assert res["username"] == "testuser"
-        # assert res["hashed_password"] == bcrypt_context.hash("testpass")
+        # assert res["hashed_password"] == crypt_context().hash("testpass")
         assert res["email"] == "testemail@test.com"
         assert res["phone_number"] == "1234567890"
         assert res["role"] == "admin"
 
 
+async def test_return_user_hides_hashed_password(test_user):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.get("http://127.0.0.1:8000/users/info/")
+        assert response.status_code == status.HTTP_200_OK
+        assert "hashed_password" not in response.json()
+
+
+async def test_return_missing_user_is_404():
+    async with AsyncClient(transport=utils.transport) as client:
+        for url in ("/users/info/", "/api/users/info/"):
+            response = await client.get(f"http://127.0.0.1:8000{url}")
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
 async def test_change_password_success(test_user):
     async with AsyncClient(transport=utils.transport) as client:
         response = await client.post(
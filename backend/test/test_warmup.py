@@ -0,0 +1,35 @@
+import logging
+
+from .. import config, hashing, warmup
+from ..database import pool_stats
+
+
+async def test_warm_up_opens_connections_compiles_templates_and_starts_hashing():
+    pool = hashing.HashingPool(max_workers=2, queue_limit=0)
+    try:
+        await pool.warm_up()
+        assert len(pool.executor()._processes) == 2
+    finally:
+        pool.shutdown()
+
+    timings = await warmup.run()
+
+    assert set(timings) == {"database", "templates", "hashing"}
+    assert pool_stats()["checked_in"] >= min(
+        config.WARMUP_DB_CONNECTIONS, config.DB_POOL_SIZE
+    )
+    env = config.templates.env
+    assert len(env.cache) >= len(env.list_templates())
+
+
+async def test_failed_step_is_logged_not_raised(monkeypatch, caplog):
+    async def broken():
+        raise RuntimeError("no backend")
+
+    monkeypatch.setattr(hashing.pool, "warm_up", broken)
+
+    with caplog.at_level(logging.WARNING, logger="backend.warmup"):
+        timings = await warmup.run()
+
+    assert "hashing" in timings
+    assert "warm-up step hashing failed" in caplog.text
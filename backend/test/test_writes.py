@@ -0,0 +1,85 @@
+from datetime import timedelta
+
+from fastapi import status
+from httpx import AsyncClient
+
+from ..apis.auth import get_current_user
+from ..database import get_db
+from ..main import app
+from ..models import Todos
+from ..routers.auth import create_access_token
+from . import utils
+
+app.dependency_overrides[get_db] = utils.override_get_db
+app.dependency_overrides[get_current_user] = utils.override_get_current_user
+
+
+def load_todo(todo_id: int) -> Todos | None:
+    db = utils.TestingSessionLocal()
+    todo = db.get(Todos, todo_id)
+    db.close()
+    return todo
+
+
+async def test_patch_updates_only_sent_fields(test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.patch(
+            "http://127.0.0.1:8000/api/todos/1/", json={"completed": True}
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "id": 1,
+        "title": "learn to code",
+        "description": "some description",
+        "priority": 1,
+        "completed": True,
+        "owner_id": 1,
+    }
+    assert load_todo(1).completed is True
+
+
+async def test_patch_rejects_empty_and_null_fields(test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.patch("http://127.0.0.1:8000/api/todos/1/", json={})
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+        response = await client.patch(
+            "http://127.0.0.1:8000/api/todos/1/", json={"title": None}
+        )
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_patch_not_found(test_todo):
+    async with AsyncClient(transport=utils.transport) as client:
+        response = await client.patch(
+            "http://127.0.0.1:8000/api/todos/999/", json={"priority": 2}
+        )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+async def test_complete_toggles_in_sql(test_todo):
+    token = create_access_token("testuser", 1, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        response = await client.get("http://127.0.0.1:8000/todos/complete/1/")
+        assert response.status_code == status.HTTP_302_FOUND
+        assert load_todo(1).completed is True
+
+        response = await client.get("http://127.0.0.1:8000/todos/complete/1/")
+        assert load_todo(1).completed is False
+
+
+async def test_html_writes_are_scoped_to_the_owner(test_todo):
+    token = create_access_token("someone", 2, timedelta(minutes=5))
+    async with AsyncClient(
+        transport=utils.transport, cookies={"access_token": token}
+    ) as client:
+        response = await client.get("http://127.0.0.1:8000/todos/complete/1/")
+        assert response.status_code == status.HTTP_302_FOUND
+        response = await client.get("http://127.0.0.1:8000/todos/delete/1/")
+        assert response.status_code == status.HTTP_302_FOUND
+
+    todo = load_todo(1)
+    assert todo is not None
+    assert todo.completed is False
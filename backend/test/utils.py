@@ -1,11 +1,13 @@
 import pytest
 from httpx import ASGITransport
 from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from .. import config as env_config
-from ..database import Base
+from .. import migrate
+from ..database import async_database_url
 from ..main import app
 
 SQLALCHEMY_TEST_DATABASE_URL = env_config.TEST_DATABASE_URL
@@ -20,15 +22,22 @@ engine = create_engine(
 
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base.metadata.create_all(bind=engine)
+async_engine = create_async_engine(
+    url=async_database_url(SQLALCHEMY_TEST_DATABASE_URL),
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+
+AsyncTestingSessionLocal = async_sessionmaker(
+    bind=async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+
+migrate.upgrade(SQLALCHEMY_TEST_DATABASE_URL, configure_logger=False)
 
 
-def override_get_db():
-    db = TestingSessionLocal()
-    try:
+async def override_get_db():
+    async with AsyncTestingSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 
 def override_get_current_user():
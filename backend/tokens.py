@@ -0,0 +1,122 @@
+"""JWT decoding with a cache of already verified tokens.
+
+Checking a token's HMAC signature and decoding its base64 payload is repeated
+for every request a browser or API client makes with the same token. Verified
+payloads are kept in a small LRU cache until the token's ``exp`` (or
+``max_ttl`` seconds for tokens without one), so repeat requests skip that work.
+
+Access tokens issued with a refresh token carry its family as ``sid``. When a
+family is revoked its id is kept in ``revoked_sessions`` until every access
+token issued from it has expired, and tokens naming it are rejected with a set
+lookup. Such tokens must carry an ``exp``, or revocation couldn't outlast them.
+Revocations are per worker: elsewhere the family's access tokens stay valid
+until they expire, but can no longer be refreshed.
+
+jose is imported the first time a token is encoded or decoded rather than when
+the app starts; ``tokens.jwt`` and ``tokens.JWTError`` import it on access.
+"""
+
+import time
+from collections import OrderedDict
+
+from . import config
+
+
+def __getattr__(name: str):
+    if name == "jwt":
+        from jose import jwt
+
+        return jwt
+    if name == "JWTError":
+        from jose import JWTError
+
+        return JWTError
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class VerifiedTokenCache:
+    def __init__(self, maxsize: int, max_ttl: float):
+        self.maxsize = maxsize
+        self.max_ttl = max_ttl
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, token: str) -> dict | None:
+        entry = self._entries.get(token)
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            del self._entries[token]
+            return None
+        self._entries.move_to_end(token)
+        return entry[1]
+
+    def set(self, token: str, payload: dict):
+        expires = time.time() + self.max_ttl
+        if isinstance(payload.get("exp"), (int, float)):
+            expires = min(expires, payload["exp"])
+        self._entries[token] = (expires, payload)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class RevokedSessions:
+    """Revoked families, each kept ``ttl`` seconds: the longest an access token
+    issued before the revocation can still be valid."""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._expires: OrderedDict[str, float] = OrderedDict()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._expires and next(iter(self._expires.values())) <= now:
+            self._expires.popitem(last=False)
+
+    def add(self, session_id: str):
+        self._evict()
+        self._expires[session_id] = time.monotonic() + self.ttl
+        self._expires.move_to_end(session_id)
+
+    def __contains__(self, session_id: str) -> bool:
+        self._evict()
+        return session_id in self._expires
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def clear(self):
+        self._expires.clear()
+
+
+verified_tokens = VerifiedTokenCache(config.TOKEN_CACHE_SIZE, config.TOKEN_CACHE_TTL)
+revoked_sessions = RevokedSessions(
+    60 * max(config.API_ACCESS_TOKEN_MINUTES, config.COOKIE_ACCESS_TOKEN_MINUTES)
+)
+
+
+def encode_token(payload: dict) -> str:
+    from jose import jwt
+
+    return jwt.encode(payload, config.JWT_SECRET_KEY, algorithm=config.JWT_ALGORITHM)
+
+
+def decode_token(token: str) -> dict:
+    """Return the payload of ``token``, raising ``JWTError`` if it is invalid."""
+    from jose import JWTError, jwt
+
+    payload = verified_tokens.get(token)
+    if payload is None:
+        payload = jwt.decode(
+            token, config.JWT_SECRET_KEY, algorithms=[config.JWT_ALGORITHM]
+        )
+        verified_tokens.set(token, payload)
+    if "sid" in payload:
+        if "exp" not in payload:
+            raise JWTError("Session token without an expiry")
+        if payload["sid"] in revoked_sessions:
+            raise JWTError("Session has been revoked")
+    return payload
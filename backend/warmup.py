@@ -0,0 +1,59 @@
+"""Warm a worker up before it accepts connections.
+
+The lifespan runs this before uvicorn starts serving, so the first requests a
+worker gets after a deploy don't pay for what it does: opening
+``WARMUP_DB_CONNECTIONS`` pooled connections, compiling every template and
+starting the hashing pool with the bcrypt backend loaded in each process. A
+step that fails is logged and skipped; the worker starts anyway and does that
+work on first use.
+"""
+
+import asyncio
+import logging
+import time
+
+from sqlalchemy import text
+
+from . import config, hashing
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+
+async def database_connections(count: int):
+    async def connect():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    # held at the same time, so each is a separate connection left in the pool
+    await asyncio.gather(*(connect() for _ in range(count)))
+
+
+async def templates():
+    env = config.templates.env
+    for name in env.list_templates():
+        env.get_template(name)
+
+
+async def run() -> dict[str, float]:
+    """Run every warm-up step and return how long each took."""
+    steps = {
+        "database": database_connections(
+            min(config.WARMUP_DB_CONNECTIONS, config.DB_POOL_SIZE)
+        ),
+        "templates": templates(),
+        "hashing": hashing.pool.warm_up(),
+    }
+    timings = {}
+    for name, step in steps.items():
+        start = time.perf_counter()
+        try:
+            await step
+        except Exception:
+            logger.warning("warm-up step %s failed", name, exc_info=True)
+        timings[name] = time.perf_counter() - start
+    logger.info(
+        "warmed up (%s)",
+        ", ".join(f"{name} {seconds:.3f}s" for name, seconds in timings.items()),
+    )
+    return timings